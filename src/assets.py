@@ -0,0 +1,59 @@
+import os, re, json
+from urllib.parse import urlsplit
+
+from manifest import hash_bytes
+from outputs import write_text_output
+
+ASSET_MANIFEST = "asset-manifest.json" # written into the output dir, maps original paths to hashed ones
+HASH_LENGTH = 10
+UNHASHED_EXTENSIONS = (".html",) # pages must keep their URLs
+
+def should_fingerprint(rel_path):
+    return not rel_path.endswith(UNHASHED_EXTENSIONS)
+
+def hashed_name(rel_path, content_hash):
+    # images/tom.png -> images/tom.1f3a9c0b2d.png
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{content_hash[:HASH_LENGTH]}{ext}"
+
+ASSET_ATTR_PATTERN = re.compile(r'((?:href|src)=")(/[^"]*)(")')
+
+
+class AssetMap():
+    # "/index.css" -> "/index.3f2a9c1b0d.css" for every fingerprinted static file
+    def __init__(self, mapping=None):
+        self.mapping = mapping or {}
+        self.digest = hash_bytes(json.dumps(self.mapping, sort_keys=True))
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        mapping = {}
+        for rel_path, entry in manifest.static.items():
+            dest = entry.get("dest")
+            if dest and dest != rel_path:
+                mapping["/" + rel_path.replace(os.sep, "/")] = "/" + dest.replace(os.sep, "/")
+        return cls(mapping)
+
+    def url(self, url):
+        # site-absolute asset URLs only; the query and fragment are kept
+        if not url.startswith("/"):
+            return url
+        path = urlsplit(url).path
+        hashed = self.mapping.get(path)
+        if hashed is None:
+            return url
+        return hashed + url[len(path):]
+
+    def rewrite_html(self, html):
+        return ASSET_ATTR_PATTERN.sub(lambda m: m[1] + self.url(m[2]) + m[3], html)
+
+    def changed(self, old_mapping):
+        # original paths whose hashed name differs from the previous build's
+        keys = set(self.mapping) | set(old_mapping)
+        return {key for key in keys if self.mapping.get(key) != old_mapping.get(key)}
+
+    def write(self, dest_dir):
+        path = os.path.join(dest_dir, ASSET_MANIFEST)
+        mapping = {key[1:]: value[1:] for key, value in sorted(self.mapping.items())}
+        write_text_output(path, json.dumps(mapping, indent=2))
+        return path
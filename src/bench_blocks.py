@@ -0,0 +1,55 @@
+# Block splitting and classification: single line scan vs. markdown_to_blocks + tag_and_strip_block,
+# on documents with long lists.
+# usage: python3 src/bench_blocks.py [items_per_list] [lists]
+import re, sys, timeit
+
+from htmlnode import ParentNode
+from utilities import *
+
+def legacy_is_ordered_list(block):
+    # the ordered-list check block_to_block_type used to run, with its splits.index() per line
+    splits = block.split("\n")
+    return all(list(map(lambda x: int(re.match(r"^(\d+?)\.\s", x)[1]) == (splits.index(x) + 1), splits)))
+
+def split_then_classify(markdown):
+    return [tag_and_strip_block(block) for block in markdown_to_blocks(markdown)]
+
+def single_scan(markdown):
+    return [classify_block_lines(lines) for lines in markdown_to_block_lines(markdown)]
+
+def render_split(markdown):
+    return ParentNode("div", [block_to_html_node(block, *tag_and_strip_block(block)) for block in markdown_to_blocks(markdown)]).to_html()
+
+def make_document(items, lists):
+    blocks = ["# Reference"]
+    for n in range(lists):
+        blocks.append(f"## List {n}")
+        blocks.append("\n".join(f"{i + 1}. ordered item {i} with **bold**" for i in range(items)))
+        blocks.append("\n".join(f"- bullet item {i}" for i in range(items)))
+        blocks.append("\n".join(f"> quoted line {i}" for i in range(items // 10)))
+    return "\n\n".join(blocks)
+
+def best(func, number=3):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    lists = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    markdown = make_document(items, lists)
+    if render_split(markdown) != markdown_to_html_node(markdown).to_html():
+        print("outputs differ!")
+    ordered = markdown_to_blocks(markdown)[2]
+
+    legacy = best(lambda: legacy_is_ordered_list(ordered), 1)
+    fixed = best(lambda: block_to_block_type(ordered))
+    print(f"{items}-item ordered list check: splits.index() {legacy * 1e3:8.2f} ms   enumerate {fixed * 1e3:8.2f} ms")
+    old = best(lambda: split_then_classify(markdown))
+    new = best(lambda: single_scan(markdown))
+    print(f"split + classify ({len(markdown) // 1024} KiB): split-based {old * 1e3:8.2f} ms   line scan {new * 1e3:8.2f} ms  ({old / new:.1f}x)")
+    old = best(lambda: render_split(markdown))
+    new = best(lambda: markdown_to_html_node(markdown).to_html())
+    print(f"full render:                split-based {old * 1e3:8.2f} ms   line scan {new * 1e3:8.2f} ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
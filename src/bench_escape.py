@@ -0,0 +1,48 @@
+# Cost of HTML escaping in serialization: render time with escape_text/escape_attribute vs with both
+# replaced by the identity, on the synthetic corpus (mostly clean text) and on text full of & and <.
+# usage: python3 src/bench_escape.py [pages] [repeats]
+import sys, shutil, tempfile, timeit
+
+import htmlnode
+from corpus import make_corpus
+from utilities import markdown_to_html_node
+
+DIRTY = 'Fish & chips <cheap> for "two" & more. ' * 4
+
+def render_all(documents):
+    for markdown in documents:
+        markdown_to_html_node(markdown).to_html()
+
+def identity(text):
+    return text
+
+def compare(name, documents, repeats):
+    # the two variants alternate so drift in machine load hits both alike; best run of each is kept
+    escape_text, escape_attribute = htmlnode.escape_text, htmlnode.escape_attribute
+    escaping = plain = float("inf")
+    for _ in range(repeats):
+        escaping = min(escaping, timeit.timeit(lambda: render_all(documents), number=1))
+        htmlnode.escape_text = htmlnode.escape_attribute = identity
+        try:
+            plain = min(plain, timeit.timeit(lambda: render_all(documents), number=1))
+        finally:
+            htmlnode.escape_text, htmlnode.escape_attribute = escape_text, escape_attribute
+    print(f"{name:<8} no escaping {plain * 1e3:8.1f} ms  escaping {escaping * 1e3:8.1f} ms  overhead {(escaping / plain - 1) * 100:+5.1f}%")
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    workdir = tempfile.mkdtemp()
+    try:
+        documents = []
+        for path in make_corpus(workdir, pages):
+            with open(path, "r") as f:
+                documents.append(f.read())
+    finally:
+        shutil.rmtree(workdir)
+    compare("corpus", documents, repeats)
+    compare("dirty", ["# Title\n\n" + "\n\n".join([DIRTY + "[a & b](/q?a=1&b=2)"] * 20)] * pages, repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Single-pass text_to_textnodes vs the old five-pass split_nodes_* pipeline on long paragraphs.
+# usage: python3 src/bench_inline.py [sentences_per_paragraph] [repeats]
+import sys, timeit
+
+from textnode import TextNode, TextType
+from utilities import *
+
+SENTENCE = "This is **bold text** with an _italic_ word, some `inline code`, an ![image](/images/a.png) and a [link](https://example.com/page). "
+
+def multipass_text_to_textnodes(text):
+    # the pipeline text_to_textnodes used to run, kept here for comparison
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+def main():
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [10, 100, 1000]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for size in sizes:
+        paragraph = SENTENCE * size
+        if text_to_textnodes(paragraph) != multipass_text_to_textnodes(paragraph):
+            print(f"sentences={size}: outputs differ!")
+        number = max(1, 2000 // size)
+        old = min(timeit.repeat(lambda: multipass_text_to_textnodes(paragraph), number=number, repeat=repeats)) / number
+        new = min(timeit.repeat(lambda: text_to_textnodes(paragraph), number=number, repeat=repeats)) / number
+        print(f"sentences={size:<6} chars={len(paragraph):<8} multipass {old * 1e3:9.3f} ms  single-pass {new * 1e3:9.3f} ms  speedup {old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
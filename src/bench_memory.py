@@ -0,0 +1,65 @@
+# Bytes per node for parsed TextNode/HTMLNode trees, slotted classes vs. equivalent __dict__-based objects.
+# usage: python3 src/bench_memory.py [paragraphs]
+import sys, tracemalloc
+
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode
+from utilities import *
+
+BLOCK = """## Heading {n}
+
+Some **bold** text, some _italic_ text and a bit of `code` with a [link](/blog/{n}) and an ![image](/images/{n}.png).
+
+- first item
+- second item with **bold**
+"""
+
+class DictNode():
+    # stand-in for the old unslotted classes, same attributes but kept in a per-instance __dict__
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+def walk(node):
+    yield node
+    for child in node.children or []:
+        yield from walk(child)
+
+def copy_tree(node):
+    if node.children is None:
+        return LeafNode(node.tag, node.value, node.props)
+    return ParentNode(node.tag, [copy_tree(child) for child in node.children], node.props)
+
+def to_dict_nodes(node):
+    children = None
+    if node.children is not None:
+        children = [to_dict_nodes(child) for child in node.children]
+    return DictNode(tag=node.tag, value=node.value, children=children, props=node.props)
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    markdown = "\n\n".join(BLOCK.format(n=n) for n in range(paragraphs))
+    text = " ".join(BLOCK.format(n=n).replace("\n", " ") for n in range(paragraphs))
+
+    # both sides rebuild the node objects around the same strings and props dicts, so only the nodes are counted
+    textnodes = text_to_textnodes(text)
+    count = len(textnodes)
+    _, slotted = measure(lambda: [TextNode(n.text, n.text_type, n.url) for n in textnodes])
+    _, unslotted = measure(lambda: [DictNode(text=n.text, text_type=n.text_type, url=n.url) for n in textnodes])
+    print(f"TextNode  x{count:<8} slotted {slotted / count:6.1f} B/node   __dict__ {unslotted / count:6.1f} B/node")
+
+    tree = markdown_to_html_node(markdown)
+    count = sum(1 for _ in walk(tree))
+    _, slotted = measure(lambda: copy_tree(tree))
+    _, unslotted = measure(lambda: to_dict_nodes(tree))
+    print(f"HTMLNode  x{count:<8} slotted {slotted / count:6.1f} B/node   __dict__ {unslotted / count:6.1f} B/node")
+
+if __name__ == "__main__":
+    main()
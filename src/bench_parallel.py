@@ -0,0 +1,51 @@
+# Pages/sec for generate_pages_recursively at 1..N worker processes.
+# usage: python3 src/bench_parallel.py [pages] [max_jobs]
+import os, sys, shutil, tempfile, time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from corpus import make_corpus
+from fileutilities import *
+
+def read_tree(root):
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    template_path = os.path.abspath(os.path.join(rootdir, "template.html"))
+
+    workdir = tempfile.mkdtemp()
+    try:
+        content = os.path.join(workdir, "content")
+        make_corpus(content, pages)
+        reference = None
+        job_counts = [1]
+        while job_counts[-1] * 2 < max_jobs:
+            job_counts.append(job_counts[-1] * 2)
+        if max_jobs > 1:
+            job_counts.append(max_jobs)
+        for jobs in job_counts:
+            dest = os.path.join(workdir, f"docs-{jobs}")
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):
+                generate_pages_recursively("/", content, template_path, dest, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            output = read_tree(dest)
+            if reference is None:
+                reference = output
+            identical = "identical" if output == reference else "DIFFERS"
+            print(f"jobs={jobs:<3} {pages / elapsed:10.1f} pages/sec  ({elapsed:.2f}s, output {identical})")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
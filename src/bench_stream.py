@@ -0,0 +1,55 @@
+# Peak traced memory of generate_page on one very large markdown file, whole-file vs. streamed, with the
+# block cache set up the way main() sets it up (in memory, plus the SQLite tier when a path is given).
+# usage: python3 src/bench_stream.py [megabytes] [block cache path]
+import os, sys, random, shutil, tempfile, time, tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+
+from corpus import generate_markdown
+from fileutilities import *
+from blockcache import BlockCache
+
+def run(source, template_path, dest, threshold, cache_path):
+    configure_streaming(threshold)
+    tracemalloc.start()
+    cache = BlockCache(64 << 20, cache_path) # main()'s default --block-cache-mb
+    configure_block_cache(cache)
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        output_hash = generate_page("/", source, template_path, dest)
+    peak = tracemalloc.get_traced_memory()[1] # before the flush, like a build's last page
+    cache.flush()
+    elapsed = time.perf_counter() - start
+    configure_block_cache(None)
+    cache.close()
+    tracemalloc.stop()
+    return output_hash, elapsed, peak
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cache_path = sys.argv[2] if len(sys.argv) > 2 else None
+    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    template_path = os.path.abspath(os.path.join(rootdir, "template.html"))
+    workdir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(workdir, "reference.md")
+        rng = random.Random(0)
+        with open(source, "w") as f:
+            f.write(generate_markdown(rng, blocks=50))
+            while f.tell() < megabytes << 20:
+                f.write("\n\n" + generate_markdown(rng, blocks=200).split("\n\n", 1)[1])
+        size = os.path.getsize(source)
+        whole = run(source, template_path, os.path.join(workdir, "whole.html"), size + 1, cache_path)
+        if cache_path:
+            os.remove(cache_path) # the streamed run starts from an empty cache too
+        streamed = run(source, template_path, os.path.join(workdir, "streamed.html"), 0, cache_path)
+        print(f"source {size / 2**20:.1f} MiB, outputs {'identical' if whole[0] == streamed[0] else 'DIFFER'}")
+        print(f"whole file: {whole[1]:6.2f}s  peak {whole[2] / 2**20:8.1f} MiB")
+        print(f"streamed:   {streamed[1]:6.2f}s  peak {streamed[2] / 2**20:8.1f} MiB")
+    finally:
+        configure_streaming(STREAM_THRESHOLD)
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Throughput of each parsing/rendering stage on a synthetic corpus, emitted as JSON so runs can be compared.
+# usage: python3 src/bench_suite.py [--pages N] [--depth D] [--blocks B] [--mix paragraph=5,codeblock=2]
+#                                   [--output results.json] [--compare baseline.json] [--threshold 0.10]
+import os, sys, json, time, shutil, argparse, platform, tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from corpus import make_corpus, parse_mix
+from fileutilities import *
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run_suite(pages, depth, blocks, mix, repeat, template_path):
+    workdir = tempfile.mkdtemp()
+    try:
+        content = os.path.join(workdir, "content")
+        paths = make_corpus(content, pages, depth=depth, blocks=blocks, mix=mix)
+        documents = []
+        for path in paths:
+            with open(path, "r") as f:
+                documents.append(f.read())
+        block_lists = [markdown_to_blocks(markdown) for markdown in documents]
+        inline_blocks = [block for blocks_ in block_lists for block in blocks_ if block[0] not in "#`"]
+        trees = [markdown_to_html_node(markdown) for markdown in documents]
+        source_bytes = sum(len(markdown.encode("utf-8")) for markdown in documents)
+
+        def end_to_end():
+            dest = os.path.join(workdir, "docs")
+            if os.path.exists(dest):
+                shutil.rmtree(dest)
+            with redirect_stdout(StringIO()):
+                generate_pages_recursively("/", content, template_path, dest)
+
+        stages = {
+            "markdown_to_blocks": lambda: [markdown_to_blocks(markdown) for markdown in documents],
+            "text_to_textnodes": lambda: [text_to_textnodes(block) for block in inline_blocks],
+            "markdown_to_html_node": lambda: [markdown_to_html_node(markdown) for markdown in documents],
+            "to_html": lambda: [tree.to_html() for tree in trees],
+            "generate_pages_recursively": end_to_end,
+        }
+        results = {}
+        for name, func in stages.items():
+            seconds = best_of(repeat, func)
+            results[name] = {
+                "seconds": seconds,
+                "pages_per_sec": pages / seconds,
+                "mb_per_sec": source_bytes / seconds / 1e6,
+            }
+        return results, source_bytes
+    finally:
+        shutil.rmtree(workdir)
+
+def compare(results, baseline, threshold):
+    # returns the stages that got slower than the baseline by more than `threshold`
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        marker = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<28} {before['seconds'] * 1e3:9.1f} ms -> {result['seconds'] * 1e3:9.1f} ms  {change * 100:+6.1f}%{marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the site generator on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--mix", default="", help="feature weights, e.g. paragraph=5,codeblock=2,link=3")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    template_path = os.path.abspath(os.path.join(rootdir, "template.html"))
+    mix = parse_mix(args.mix)
+    results, source_bytes = run_suite(args.pages, args.depth, args.blocks, mix, args.repeat, template_path)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pages": args.pages,
+            "depth": args.depth,
+            "blocks": args.blocks,
+            "mix": mix,
+            "repeat": args.repeat,
+            "source_bytes": source_bytes,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
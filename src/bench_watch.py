@@ -0,0 +1,59 @@
+# Save-to-HTML latency of --watch mode on a synthetic content tree.
+# usage: python3 src/bench_watch.py [pages] [edits]
+import os, sys, shutil, tempfile, threading, time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from corpus import make_corpus
+from fileutilities import *
+from watch import SiteWatcher, snapshot_tree
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    template_path = os.path.abspath(os.path.join(rootdir, "template.html"))
+
+    workdir = tempfile.mkdtemp()
+    try:
+        content = os.path.join(workdir, "content")
+        static = os.path.join(workdir, "static")
+        dest = os.path.join(workdir, "docs")
+        sources = make_corpus(content, pages)
+        os.makedirs(static)
+        with redirect_stdout(StringIO()):
+            generate_pages_incremental("/", content, template_path, dest)
+
+        start = time.perf_counter()
+        snapshot_tree(content)
+        print(f"{pages} pages, one scan of content/ takes {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+        watcher = SiteWatcher("/", content, static, template_path, dest)
+        stop = threading.Event()
+        thread = threading.Thread(target=watcher.run, kwargs={"stop": stop})
+        with redirect_stdout(StringIO()): # the watcher's own output, until it has stopped
+            thread.start()
+            latencies = []
+            try:
+                for n in range(edits):
+                    source = sources[n * (pages // edits)]
+                    output = os.path.join(dest, os.path.relpath(source, content)[:-3] + ".html")
+                    before = os.stat(output).st_mtime_ns
+                    time.sleep(0.5)
+                    with open(source, "a") as f:
+                        f.write(f"\n\nedit {n}\n")
+                    saved = time.perf_counter()
+                    while os.stat(output).st_mtime_ns == before:
+                        time.sleep(0.002)
+                    latencies.append(time.perf_counter() - saved)
+            finally:
+                stop.set()
+                thread.join() # its last rebuild may still be saving the manifest
+        latencies.sort()
+        print(f"save -> updated HTML over {edits} edits: median {latencies[len(latencies) // 2] * 1e3:.0f} ms, worst {latencies[-1] * 1e3:.0f} ms")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
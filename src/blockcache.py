@@ -0,0 +1,132 @@
+import hashlib, sqlite3
+from collections import OrderedDict
+
+import utilities, htmlnode, textnode, links
+
+RENDERER_MODULES = (utilities, htmlnode, textnode, links)
+
+def renderer_fingerprint(*options):
+    # any edit to the rendering code (or a change in render options) gives a new fingerprint,
+    # which is what invalidates both cache tiers
+    h = hashlib.sha256()
+    for module in RENDERER_MODULES:
+        with open(module.__file__, "rb") as f:
+            h.update(f.read())
+    for option in options:
+        h.update(repr(option).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _entry_size(entry):
+    html, links = entry
+    return len(html) + sum(len(link) for link in links)
+
+
+class BlockCache():
+    def __init__(self, max_bytes=64 << 20, disk_path=None, fingerprint=None):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.fingerprint = fingerprint or renderer_fingerprint()
+        self.salt = self.fingerprint.encode("ascii")
+        self.memory = OrderedDict() # key -> (html, link targets), least recently used first
+        self.memory_bytes = 0
+        self.pending = {} # new entries not yet written to disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if disk_path:
+            self._open_disk()
+
+    def __getstate__(self):
+        # only the configuration crosses into worker processes; each one opens its own connection
+        return {"max_bytes": self.max_bytes, "disk_path": self.disk_path, "fingerprint": self.fingerprint}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _open_disk(self):
+        self.db = sqlite3.connect(self.disk_path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL") # lets parallel workers read while one writes
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+        if row is None or row[0] != self.fingerprint:
+            with self.db:
+                self.db.execute("DROP TABLE IF EXISTS blocks") # recreated, so a schema change is covered too
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+        self.db.execute("CREATE TABLE IF NOT EXISTS blocks (key BLOB PRIMARY KEY, html TEXT, links TEXT)")
+
+    def key(self, block):
+        h = hashlib.blake2b(self.salt, digest_size=16)
+        h.update(block.encode("utf-8"))
+        return h.digest()
+
+    def get(self, key):
+        # returns (html, link targets) or None
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return entry
+        if self.db is not None:
+            row = self.db.execute("SELECT html, links FROM blocks WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                entry = (row[0], tuple(row[1].split("\n")) if row[1] else ())
+                self._remember(key, entry)
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if self.db is not None:
+            self.pending[key] = entry
+
+    def _remember(self, key, entry):
+        size = _entry_size(entry)
+        if size > self.max_bytes:
+            return
+        self.memory[key] = entry
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= _entry_size(evicted)
+            self.evictions += 1
+
+    def flush(self):
+        if self.db is None or not self.pending:
+            return
+        rows = [(key, html, "\n".join(links)) for key, (html, links) in self.pending.items()]
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", rows)
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def counts(self):
+        return (self.hits, self.disk_hits, self.misses, self.evictions)
+
+    def merge_counts(self, counts):
+        # folds in the counters a worker process reported
+        self.hits += counts[0]
+        self.disk_hits += counts[1]
+        self.misses += counts[2]
+        self.evictions += counts[3]
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_bytes,
+        }
@@ -0,0 +1,54 @@
+# Thin client for the build daemon (python3 src/main.py --daemon). Imports nothing from the site
+# generator, so a request costs interpreter startup plus the build itself.
+# usage: python3 src/client.py build [--full] [PATH ...]
+#        python3 src/client.py render [FILE] [--page]    (markdown from stdin without FILE)
+#        python3 src/client.py ping | stats | shutdown
+import os, sys, json, argparse
+
+from daemon import default_socket_path, send_request
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a request to the running build daemon.")
+    parser.add_argument("op", choices=["build", "render", "ping", "stats", "shutdown"])
+    parser.add_argument("paths", nargs="*", help="build: changed or deleted files (default: the whole site); render: a markdown file")
+    parser.add_argument("--full", action="store_true", help="build: rebuild everything, like main.py --full")
+    parser.add_argument("--page", action="store_true", help="render: wrap the content in the template")
+    parser.add_argument("--socket", metavar="PATH", help="daemon socket (default: .build-daemon.sock in the repo root)")
+    parser.add_argument("--quiet", "-q", action="store_true", help="don't print the build log")
+    args = parser.parse_intermixed_args()
+
+    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    request = {"op": args.op}
+    if args.op == "build":
+        request["paths"] = [os.path.abspath(path) for path in args.paths] # the daemon's cwd may differ
+        request["full"] = args.full
+    elif args.op == "render":
+        if args.paths:
+            with open(args.paths[0], "r", encoding="utf-8") as f:
+                request["markdown"] = f.read()
+        else:
+            request["markdown"] = sys.stdin.read()
+        request["page"] = args.page
+
+    try:
+        response = send_request(args.socket or default_socket_path(rootdir), request)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("No build daemon is running; start one with: python3 src/main.py --daemon", file=sys.stderr)
+        sys.exit(2)
+
+    if not args.quiet and response.get("log"):
+        print(response["log"], end="", file=sys.stderr)
+    if not response.get("ok"):
+        print(f"error: {response.get('error')}", file=sys.stderr)
+        sys.exit(1)
+    if args.op == "render":
+        print(response["html"])
+        return
+    summary = {key: value for key, value in response.items() if key not in ("ok", "log")}
+    print(json.dumps(summary, indent=2))
+    if response.get("broken_links"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
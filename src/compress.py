@@ -0,0 +1,104 @@
+import os, gzip
+from concurrent.futures import ThreadPoolExecutor
+
+from outputs import record_output, remove_output
+
+# zstd and brotli are optional; .gz is always written
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml")
+MIN_SIZE = 1024 # below this the compressed file saves less than a packet
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0) # mtime=0 keeps the output reproducible
+
+def _zstd(data):
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+def available_encodings():
+    # (suffix, compress function) for every encoding this interpreter can produce
+    encodings = [(".gz", _gzip)]
+    if zstandard is not None:
+        encodings.append((".zst", _zstd))
+    if brotli is not None:
+        encodings.append((".br", _brotli))
+    return encodings
+
+ALL_SUFFIXES = (".gz", ".zst", ".br")
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+def remove_compressed(path):
+    # drops the precompressed siblings of an output that is gone
+    for suffix in ALL_SUFFIXES:
+        remove_output(path + suffix)
+
+
+class Precompressor():
+    # Writes .gz (and .zst/.br) siblings next to outputs on a thread pool, so compression runs while
+    # pages are still being rendered; zlib, zstd and brotli release the GIL while they work.
+    def __init__(self, dest_dir, manifest, min_size=MIN_SIZE, workers=4):
+        self.dest_dir = dest_dir
+        self.manifest = manifest # manifest.compressed: rel output path -> content key it was compressed from
+        self.min_size = min_size
+        self.encodings = available_encodings()
+        self.suffixes = [suffix for suffix, _ in self.encodings]
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.futures = []
+        self.unchanged = 0
+
+    def submit(self, path, content_key):
+        # content_key identifies the file's content (its hash, normally); an output whose key matches the
+        # last build and whose siblings are all still there is not recompressed
+        if not is_compressible(path):
+            return
+        rel_path = os.path.relpath(path, self.dest_dir)
+        if self.manifest.compressed.get(rel_path) == content_key and all(os.path.exists(path + suffix) for suffix in self.suffixes):
+            self.unchanged += 1
+            for suffix in self.suffixes:
+                record_output(path + suffix, False)
+            return
+        self.futures.append(self.pool.submit(self._compress, path, rel_path, content_key))
+
+    def _compress(self, path, rel_path, content_key):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < self.min_size:
+            remove_compressed(path)
+            self.manifest.compressed.pop(rel_path, None)
+            return False
+        for suffix, compress in self.encodings:
+            tmp_path = path + suffix + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compress(data))
+            os.replace(tmp_path, path + suffix)
+            record_output(path + suffix, True)
+        self.manifest.compressed[rel_path] = content_key
+        return True
+
+    def finish(self):
+        # waits for outstanding work and forgets outputs that no longer exist;
+        # returns (compressed, unchanged) since the previous finish()
+        compressed = sum(1 for future in self.futures if future.result())
+        unchanged = self.unchanged
+        self.futures = []
+        self.unchanged = 0
+        for rel_path in list(self.manifest.compressed):
+            if not os.path.exists(os.path.join(self.dest_dir, rel_path)):
+                del self.manifest.compressed[rel_path]
+        return compressed, unchanged
+
+    def close(self):
+        self.finish()
+        self.pool.shutdown()
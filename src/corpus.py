@@ -0,0 +1,97 @@
+import os, random
+
+# Synthetic content/ trees for benchmarks. Block and inline features are picked by weight, so a mix like
+# {"codeblock": 5, "paragraph": 1} gives a site heavy on fenced code; everything is seeded and reproducible.
+
+BLOCK_FEATURES = ("heading", "paragraph", "ulist", "olist", "quote", "codeblock")
+INLINE_FEATURES = ("plain", "bold", "italic", "inline_code", "link", "image")
+
+DEFAULT_MIX = {
+    "heading": 2, "paragraph": 6, "ulist": 2, "olist": 1, "quote": 1, "codeblock": 1,
+    "plain": 12, "bold": 2, "italic": 2, "inline_code": 1, "link": 1, "image": 1,
+}
+
+WORDS = (
+    "the ring was forged in secret fires of mount doom while elves and men watched from afar "
+    "hobbits prefer second breakfast quiet gardens and long walks along the shire road"
+).split()
+
+def parse_mix(text):
+    # "paragraph=5,codeblock=2" -> {"paragraph": 5, "codeblock": 2}, merged over the defaults
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for item in text.split(","):
+            name, _, weight = item.partition("=")
+            name = name.strip()
+            if name not in BLOCK_FEATURES and name not in INLINE_FEATURES:
+                raise ValueError(f"unknown corpus feature: {name}")
+            mix[name] = float(weight)
+    return mix
+
+def _words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def _inline(rng, mix, sentences=3):
+    weights = [mix.get(feature, 0) for feature in INLINE_FEATURES]
+    pieces = []
+    for _ in range(sentences * 4):
+        feature = rng.choices(INLINE_FEATURES, weights)[0]
+        text = _words(rng, rng.randint(2, 6))
+        match feature:
+            case "plain":
+                pieces.append(text)
+            case "bold":
+                pieces.append(f"**{text}**")
+            case "italic":
+                pieces.append(f"_{text}_")
+            case "inline_code":
+                pieces.append(f"`{text}`")
+            case "link":
+                pieces.append(f"[{text}](/blog/{rng.randint(0, 999)})")
+            case "image":
+                pieces.append(f"![{text}](/images/{rng.randint(0, 99)}.png)")
+    return " ".join(pieces) + "."
+
+def _block(rng, mix):
+    weights = [mix.get(feature, 0) for feature in BLOCK_FEATURES]
+    feature = rng.choices(BLOCK_FEATURES, weights)[0]
+    match feature:
+        case "heading":
+            return f"{'#' * rng.randint(2, 6)} {_words(rng, 4)}"
+        case "paragraph":
+            return _inline(rng, mix)
+        case "ulist":
+            return "\n".join(f"- {_inline(rng, mix, 1)}" for _ in range(rng.randint(2, 8)))
+        case "olist":
+            return "\n".join(f"{n + 1}. {_inline(rng, mix, 1)}" for n in range(rng.randint(2, 8)))
+        case "quote":
+            return "\n".join(f"> {_inline(rng, mix, 1)}" for _ in range(rng.randint(1, 4)))
+        case "codeblock":
+            lines = [f"    {_words(rng, 5)}" for _ in range(rng.randint(2, 10))]
+            return "```\n" + "\n".join(lines) + "\n```"
+
+def generate_markdown(rng, blocks=20, mix=None):
+    mix = mix or DEFAULT_MIX
+    parts = [f"# {_words(rng, 5)}"] # every page needs an h1 for extract_title
+    parts.extend(_block(rng, mix) for _ in range(blocks))
+    return "\n\n".join(parts) + "\n"
+
+def page_path(root, n, depth=2, fanout=10):
+    # spreads pages over `depth` levels of directories with `fanout` entries each
+    dirs = []
+    rest = n
+    for _ in range(depth):
+        rest //= fanout
+        dirs.append(f"section{rest % fanout}")
+    return os.path.join(root, *reversed(dirs), f"page{n}.md")
+
+def make_corpus(root, pages, depth=2, fanout=10, blocks=20, mix=None, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for n in range(pages):
+        path = page_path(root, n, depth, fanout)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(generate_markdown(rng, blocks, mix))
+        paths.append(path)
+    return paths
@@ -0,0 +1,88 @@
+import os, json, time, socket, socketserver
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Kept free of the site generator imports so client.py, which imports this, starts in milliseconds.
+
+def default_socket_path(rootdir):
+    return os.path.join(os.path.abspath(rootdir), ".build-daemon.sock")
+
+def send_request(socket_path, request, timeout=None):
+    # one JSON object per line each way
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError(f"{socket_path}: daemon closed the connection without replying")
+    return json.loads(line)
+
+def is_listening(socket_path):
+    try:
+        return send_request(socket_path, {"op": "ping"}, timeout=1).get("ok", False)
+    except (OSError, ValueError):
+        return False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"ok": False, "error": "request is not valid JSON"}
+        else:
+            response = self.server.build_daemon.handle(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class BuildDaemon():
+    # Serves build requests over a Unix socket, one at a time, from a single long-lived process so
+    # imports, the compiled template, source hashes and the block cache stay warm between builds.
+    # handlers: op name -> callable(request) returning a dict that is merged into the response.
+    def __init__(self, socket_path, handlers):
+        self.socket_path = socket_path
+        self.handlers = dict(handlers)
+        self.handlers["ping"] = lambda request: {"pid": os.getpid()}
+        self.handlers["shutdown"] = self._shutdown
+        self.stopping = False
+        self.requests = 0
+
+    def _shutdown(self, request):
+        self.stopping = True
+        return {}
+
+    def handle(self, request):
+        op = request.get("op")
+        handler = self.handlers.get(op)
+        if handler is None:
+            return {"ok": False, "error": f"unknown op {op!r}, expected one of {sorted(self.handlers)}"}
+        self.requests += 1
+        start = time.perf_counter()
+        log = StringIO()
+        try:
+            with redirect_stdout(log): # build output goes back to the client instead of the daemon's terminal
+                result = handler(request)
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}", "log": log.getvalue()}
+        response = {"ok": True, "seconds": time.perf_counter() - start, "log": log.getvalue()}
+        response.update(result)
+        return response
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            if is_listening(self.socket_path):
+                raise RuntimeError(f"a build daemon is already listening on {self.socket_path}")
+            os.remove(self.socket_path) # left behind by a daemon that didn't shut down cleanly
+        server = socketserver.UnixStreamServer(self.socket_path, _RequestHandler)
+        server.build_daemon = self
+        print(f"Build daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            with server:
+                while not self.stopping:
+                    server.handle_request()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
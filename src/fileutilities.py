@@ -1,64 +1,603 @@
-import os, shutil
+import os, shutil, time
+from io import StringIO
+from urllib.parse import urlsplit
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from htmlnode import *
 from textnode import * 
 from utilities import *
+from manifest import *
+from template import load_template, seed_template_cache, cached_template_entry
+from links import page_url_rewriter, take_page_links, check_manifest_links
+from assets import *
+from compress import remove_compressed
+from imagesize import ImageAttributes
+from search import configure_search, search_enabled, record_page_terms, take_page_terms, SearchIndex
+from outputs import *
+from shards import assign_shards, ShardMergeError
+from blockcache import renderer_fingerprint
+from inventory import SiteInventory
+from instrumentation import StageTimer, measure_minify
 
 def recursive_copy(source, dest):
-    items = os.listdir(source)
-    if len(items) == 0:
-        return
-    for item in items:
-        newsource = os.path.join(source, item)
-        if os.path.isfile(newsource):
-            result = shutil.copy(newsource, dest)
-            print(f"Copying {newsource} to {result}")
-        elif os.path.isdir(newsource):
-            newdest = os.path.join(dest, item)
+    inventory = SiteInventory.scan(source, stat=False)
+    for rel_dir in inventory.dirs:
+        newdest = os.path.join(dest, rel_dir)
+        if not os.path.exists(newdest):
             os.mkdir(newdest)
             print(f"mkdir {newdest}")
-            recursive_copy(newsource, newdest)
+    for site_file in inventory.files.values():
+        result = shutil.copy(site_file.path, os.path.join(dest, os.path.dirname(site_file.rel_path)))
+        print(f"Copying {site_file.path} to {result}")
     return
 
-def copy_static(source, dest):
+def copy_static(source, dest, clean=True):
     
-    if os.path.exists(dest):
+    if clean and os.path.exists(dest):
         shutil.rmtree(dest) # remove any existing data
-    os.mkdir(dest)
+    if not os.path.exists(dest):
+        os.mkdir(dest)
 
     recursive_copy(source, dest)
 
+LARGE_FILE = 1 << 20 # above this, copy in-kernel with copy_file_range
+
+def copy_file(source, dest):
+    # copy through a temp name so a half-copied asset is never visible, then carry over mtime for later syncs
+    tmp_dest = dest + ".tmp"
+    size = os.path.getsize(source)
+    copied = False
+    if size >= LARGE_FILE and hasattr(os, "copy_file_range"):
+        try:
+            with open(source, "rb") as fsrc, open(tmp_dest, "wb") as fdst:
+                remaining = size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+            copied = remaining == 0
+        except OSError:
+            copied = False # e.g. cross-device or unsupported filesystem; shutil falls back to sendfile/read-write
+    if not copied:
+        shutil.copyfile(source, tmp_dest)
+    shutil.copystat(source, tmp_dest)
+    os.replace(tmp_dest, dest)
+
+def _static_is_current(source_path, dest_path, stat, entry, verify_hash):
+    # returns (current, source hash or None, whether dest still needs the source's mtime)
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False, None, False
+    if dest_stat.st_size != stat.st_size:
+        return False, None, False
+    if dest_stat.st_mtime_ns == stat.st_mtime_ns:
+        return True, entry.get("hash") if entry else None, False
+    if not verify_hash:
+        return False, None, False
+    # same size, different mtime (fresh checkout, touched file): compare content before copying
+    source_hash = hash_file(source_path)
+    if hash_file(dest_path) != source_hash:
+        return False, source_hash, False
+    return True, source_hash, True
+
+def _fingerprint_hashes(pending, manifest, workers):
+    # content hashes for fingerprinted assets, reused from the manifest while size and mtime are unchanged;
+    # the rest are hashed on a thread pool (hashlib releases the GIL on large buffers)
+    hashes = {}
+    to_hash = []
+    for rel_path, source_path, stat in pending:
+        entry = manifest.static.get(rel_path)
+        if entry and entry.get("hash") and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+            hashes[rel_path] = entry["hash"]
+        else:
+            to_hash.append((rel_path, source_path))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (rel_path, _), source_hash in zip(to_hash, pool.map(hash_file, [path for _, path in to_hash])):
+            hashes[rel_path] = source_hash
+    return hashes
+
+def plan_static(source, dest, manifest, verify_hash=False, workers=8, fingerprint=False, inventory=None):
+    # What sync_static would do, without writing anything: returns (the manifest's new static entries,
+    # (source, dest) pairs to copy, dest paths already current, dest paths to remove, (source, dest)
+    # pairs of current files whose dest gets the source's mtime so the next build skips the hashing)
+    if inventory is None:
+        inventory = SiteInventory.scan(source)
+    current = {}
+    to_copy = []
+    to_fingerprint = []
+    unchanged = []
+    restamp = []
+    for site_file in inventory.files.values():
+        rel_path = site_file.rel_path
+        stat = site_file.stat
+        if fingerprint and should_fingerprint(rel_path):
+            to_fingerprint.append((rel_path, site_file.path, stat))
+            continue
+        dest_path = os.path.join(dest, rel_path)
+        is_current, source_hash, needs_mtime = _static_is_current(site_file.path, dest_path, stat, manifest.static.get(rel_path), verify_hash)
+        current[rel_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": source_hash}
+        if is_current:
+            unchanged.append(dest_path)
+            if needs_mtime:
+                restamp.append((site_file.path, dest_path))
+        else:
+            to_copy.append((site_file.path, dest_path))
+
+    hashes = _fingerprint_hashes(to_fingerprint, manifest, workers)
+    for rel_path, source_path, stat in to_fingerprint:
+        rel_dest = hashed_name(rel_path, hashes[rel_path])
+        dest_path = os.path.join(dest, rel_dest)
+        current[rel_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": hashes[rel_path], "dest": rel_dest}
+        if os.path.isfile(dest_path) and os.path.getsize(dest_path) == stat.st_size:
+            unchanged.append(dest_path) # the name is the content, so an existing file is the same file
+        else:
+            to_copy.append((source_path, dest_path))
+
+    current_dests = {entry.get("dest", rel_path) for rel_path, entry in current.items()}
+    stale = [os.path.join(dest, entry.get("dest", rel_path)) for rel_path, entry in manifest.static.items() if entry.get("dest", rel_path) not in current_dests]
+    return current, to_copy, unchanged, stale, restamp
+
+def sync_static(source, dest, manifest=None, verify_hash=False, workers=8, report=None, fingerprint=False, inventory=None):
+    # Incremental alternative to copy_static: copies only new or changed files, removes files that
+    # came from static/ on an earlier build but are gone now, and never touches generated pages.
+    # With fingerprint, assets are written to content-hashed names (see assets.py) and
+    # asset-manifest.json is written next to them.
+    if manifest is None:
+        manifest = BuildManifest.load(manifest_path(dest))
+    if inventory is None:
+        inventory = SiteInventory.scan(source)
+    os.makedirs(dest, exist_ok=True)
+    start = time.perf_counter()
+
+    current, to_copy, unchanged, stale, restamp = plan_static(source, dest, manifest, verify_hash, workers, fingerprint, inventory)
+    for rel_dir in inventory.dirs:
+        os.makedirs(os.path.join(dest, rel_dir), exist_ok=True)
+    for source_path, dest_path in restamp:
+        shutil.copystat(source_path, dest_path)
+    for dest_path in unchanged:
+        record_output(dest_path, False)
+    for source_path, dest_path in to_copy:
+        print(f"Copying {source_path} to {dest_path}")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda pair: copy_file(*pair), to_copy))
+    for _, dest_path in to_copy:
+        record_output(dest_path, True)
+
+    removed = 0
+    for stale_path in stale:
+        if remove_output(stale_path):
+            print(f"Removing {stale_path} (no longer in {source})")
+            removed += 1
+        remove_compressed(stale_path)
+        _remove_empty_parents(os.path.dirname(stale_path), dest)
+
+    for rel_path, entry in current.items():
+        precompress(os.path.join(dest, entry.get("dest", rel_path)), entry["hash"] or f"{entry['mtime']}:{entry['size']}")
+
+    manifest.static = current
+    manifest.save()
+    if fingerprint:
+        AssetMap.from_manifest(manifest).write(dest)
+    else:
+        remove_output(os.path.join(dest, ASSET_MANIFEST)) # left over from a fingerprinted build
+    if report is not None:
+        report.add_stage("static_copy", time.perf_counter() - start)
+        report.static_bytes += sum(os.path.getsize(source_path) for source_path, _ in to_copy)
+    print(f"\n{len(to_copy)} static files copied, {len(unchanged)} unchanged, {removed} removed.")
+    return len(to_copy), len(unchanged), removed
+
+def _remove_empty_parents(path, stop):
+    stop = os.path.abspath(stop)
+    path = os.path.abspath(path)
+    while path != stop and path.startswith(stop):
+        try:
+            os.rmdir(path)
+        except OSError:
+            return # not empty (or already gone)
+        path = os.path.dirname(path)
+
+_block_cache = None # set by configure_block_cache, shared by every page rendered in this process
+
+def configure_block_cache(cache):
+    global _block_cache
+    _block_cache = cache
+
+def flush_block_cache():
+    if _block_cache is not None:
+        _block_cache.flush()
+
+_precompressor = None # Precompressor set by configure_precompression; outputs are handed to it as they are written
+
+def configure_precompression(precompressor):
+    global _precompressor
+    _precompressor = precompressor
+
+def precompress(path, content_key):
+    if _precompressor is not None:
+        _precompressor.submit(path, content_key)
+
+def finish_precompression():
+    # returns (compressed, unchanged), or None when precompression is off
+    if _precompressor is not None:
+        return _precompressor.finish()
+    return None
+
+def drop_precompressed(dest_dir, manifest):
+    # precompression turned off: remove the siblings an earlier build wrote
+    for rel_path in manifest.compressed:
+        remove_compressed(os.path.join(dest_dir, rel_path))
+    manifest.compressed = {}
+
+_assets = None # AssetMap of fingerprinted static files, set by configure_assets
+
+def configure_assets(assets):
+    global _assets
+    _assets = assets
+
+_images = None # ImageAttributes for <img> tags, set by configure_images
+
+def configure_images(images):
+    global _images
+    _images = images
+
+STREAM_THRESHOLD = 32 << 20 # sources at least this big are parsed block by block instead of read whole
+_stream_threshold = STREAM_THRESHOLD
+
+def configure_streaming(threshold):
+    global _stream_threshold
+    _stream_threshold = threshold
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line[:-1] if line.endswith("\n") else line
+
 def generate_page(basepath, from_path, template_path, dest_path):
     print(f"\nGenerating page from {from_path} to {dest_path} using {template_path}.")
 
-    with open(from_path, "r") as f:
-        markdown = f.read()
-    
-    with open(template_path, "r") as f:
-        template = f.read()
-
-    node = markdown_to_html_node(markdown)
-    html = node.to_html()
+    template = load_template(template_path) # compiled once per build, re-read only if the file changes
+    page_url_rewriter(basepath, _assets, _images) # link targets get the basepath (and hashed asset names) as their nodes are built
+    timer = stage_timer() # set while generate_page_timed runs
 
-    title = extract_title(markdown)
-    finalhtml = template.replace("{{ Title }}", title).replace("{{ Content }}", html).replace("href=\"/", f"href=\"{basepath}").replace("src=\"/", f"src=\"{basepath}")
+    if os.path.getsize(from_path) >= _stream_threshold:
+        # huge source: one cheap pass for the title and outline (the title comes before the content in
+        # the template), then the content is rendered block by block straight into the output file
+        stage_lap("read") # the source itself is read as it is parsed
+        document = scan_document(read_lines(from_path))
+        # no block cache: its LRU and its pending disk writes would end up holding the whole page's HTML
+        document.body = StreamedMarkdown(lambda: split_front_matter(read_lines(from_path))[1])
+        title = document.require_title()
+        if search_enabled():
+            record_page_terms(title, read_lines(from_path))
+    else:
+        with open(from_path, "r", encoding="utf-8") as f:
+            markdown = f.read()
+        stage_lap("read")
+        document = parse_document(markdown, _block_cache)
+        title = document.require_title()
+        if search_enabled():
+            record_page_terms(title, markdown.splitlines())
+    record_page_document(document)
+    stage_lap("inline_parse")
 
+    minify = minify_enabled()
+    template.literals(basepath, _assets, minify)
     dest_parent = os.path.abspath(os.path.join(dest_path, os.path.pardir))
-    if not os.path.exists(dest_parent):
-        os.makedirs(dest_parent)
-    with open(dest_path, "w") as f:
-        f.write(finalhtml)
-
-def generate_pages_recursively(basepath, dir_path_content, template_path, dest_dir_path):
-    items = os.listdir(dir_path_content)
-    for item in items:
-        itempath = os.path.join(dir_path_content, item)
-        if os.path.isfile(itempath) and item[-3:] == '.md':
-            dest_filename = item[0:-3] + ".html"
-            dest_filepath = os.path.join(dest_dir_path, dest_filename)
-            generate_page(basepath, itempath, template_path, dest_filepath)
-        elif os.path.isdir(itempath):
-            new_dest_path = os.path.join(dest_dir_path, item)
-            generate_pages_recursively(basepath, itempath, template_path, new_dest_path)
+    os.makedirs(dest_parent, exist_ok=True) # exist_ok: parallel workers may race on shared directories
+    stage_lap("template")
+    # streamed, never held as one string; an identical page leaves the existing file (and its mtime) alone
+    def emit(writer):
+        template.write(timer.writer(writer) if timer is not None else writer, {"Title": escape_text(title), "Content": document.body}, basepath, _assets, minify)
+    output_hash = write_output(dest_path, emit)
+    stage_lap("write")
+    return output_hash
+
+def generate_page_timed(basepath, from_path, template_path, dest_path):
+    # generate_page with its stage timer on, for --report; returns (output hash, per-page record)
+    timer = StageTimer(trace_memory=True)
+    configure_stage_timer(timer)
+    try:
+        output_hash = generate_page(basepath, from_path, template_path, dest_path)
+    finally:
+        configure_stage_timer(None)
+    record = timer.page_record(from_path, dest_path)
+    if minify_enabled() and record["bytes_in"] < _stream_threshold:
+        # a streamed page can't be held whole for the comparison, so it goes without
+        record.update(measure_minify(basepath, from_path, load_template(template_path), _assets, _images, record["bytes_out"]))
+    return output_hash, record
+
+def render_markdown(basepath, markdown, template_path=None):
+    # a page's HTML as a string, rendered with the same settings as generate_page; the bare content
+    # without a template, otherwise the whole page (then the markdown needs its h1)
+    page_url_rewriter(basepath, _assets, _images)
+    document = parse_document(markdown, _block_cache)
+    minify = minify_enabled()
+    if template_path is None:
+        return document.body.to_minified_html() if minify else document.body.to_html()
+    sink = StringIO()
+    load_template(template_path).write(sink, {"Title": escape_text(document.require_title()), "Content": document.body}, basepath, _assets, minify)
+    return sink.getvalue()
+
+class PageBuildError(Exception):
+    def __init__(self, source_path, message):
+        super().__init__(f"{source_path}: {message}")
+        self.source_path = source_path
+        self.message = message
+
+    def __reduce__(self):
+        # keep the page path when the error crosses a process boundary
+        return (PageBuildError, (self.source_path, self.message))
+
+def _init_worker(template_path, stamp, template, cache, stream_threshold, assets, images, minify, search):
+    seed_template_cache(template_path, stamp, template)
+    configure_block_cache(cache)
+    configure_streaming(stream_threshold)
+    configure_assets(assets)
+    configure_images(images)
+    configure_minify(minify)
+    configure_search(search)
+
+def _render_page_job(job):
+    basepath, source_path, template_path, dest_path, instrument = job
+    cache = _block_cache
+    counts = cache.counts() if cache else None
+    try:
+        if instrument:
+            output_hash, record = generate_page_timed(basepath, source_path, template_path, dest_path)
+        else:
+            output_hash, record = generate_page(basepath, source_path, template_path, dest_path), None
+    except Exception as e:
+        raise PageBuildError(source_path, f"{type(e).__name__}: {e}") from e
+    page = (output_hash, take_page_links(), take_page_terms(), take_page_document())
+    written = last_write_changed()
+    if cache is None:
+        return page, written, record, None, None
+    # counters and newly rendered blocks travel back so the parent's cache (and its disk tier) sees them
+    delta = tuple(after - before for after, before in zip(cache.counts(), counts))
+    new_entries, cache.pending = cache.pending, {}
+    return page, written, record, delta, new_entries
+
+def render_pages(basepath, pages, template_path, jobs=1, report=None):
+    # renders (source, dest) pairs and returns (output hash, internal links, search terms, document
+    # summary) for each, in the same order; the terms are (title, counts), or None without a search index
+    instrument = report is not None
+    job_list = [(basepath, source_path, template_path, dest_path, instrument) for source_path, dest_path in pages]
+    if jobs <= 1 or len(job_list) <= 1:
+        results = []
+        for job in job_list:
+            results.append(_render_page_job(job))
+            precompress(job[3], results[-1][0][0]) # compresses on a thread while the next page renders
+        if _block_cache is not None:
+            for _, _, _, _, new_entries in results:
+                _block_cache.pending.update(new_entries) # counters were updated in place already
+    else:
+        jobs = min(jobs, len(job_list))
+        chunksize = max(1, min(64, len(job_list) // (jobs * 4))) # ~4 chunks per worker keeps stragglers short
+        stamp, template = cached_template_entry(template_path)
+        initargs = (template_path, stamp, template, _block_cache, _stream_threshold, _assets, _images, minify_enabled(), search_enabled())
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+            results = []
+            for job, result in zip(job_list, pool.map(_render_page_job, job_list, chunksize=chunksize)):
+                results.append(result)
+                record_output(job[3], result[1]) # written in the worker, where nothing is recorded
+                precompress(job[3], result[0][0])
+        if _block_cache is not None:
+            for _, _, _, delta, new_entries in results:
+                _block_cache.merge_counts(delta)
+                _block_cache.pending.update(new_entries)
+    flush_block_cache()
+    if instrument:
+        for _, _, record, _, _ in results:
+            report.add_page(record)
+    return [page for page, _, _, _, _ in results]
+
+def generate_pages_recursively(basepath, dir_path_content, template_path, dest_dir_path, jobs=1):
+    pages = collect_pages(dir_path_content, dest_dir_path)
+    if jobs > 1:
+        render_pages(basepath, pages, template_path, jobs)
+        return
+    for source_path, dest_path in pages:
+        generate_page(basepath, source_path, template_path, dest_path)
+
+def collect_pages(dir_path_content, dest_dir_path, inventory=None):
+    # (source, dest) pairs for every page, from a SiteInventory of the content dir
+    if inventory is None:
+        inventory = SiteInventory.scan(dir_path_content, stat=False)
+    return [(site_file.path, dest_path) for site_file, dest_path in inventory.pages(dest_dir_path)]
+
+def plan_pages(basepath, dir_path_content, template_path, dest_dir_path, manifest, full=False, shard=None, inventory=None):
+    # Which pages need rendering, decided without rendering or removing anything; the manifest's build
+    # settings are brought up to date on the way (generate_pages_incremental saves them with the pages).
+    # Returns (dirty, skipped, deleted): dirty holds (source, dest, rel source, source hash, stat) per
+    # page to render, skipped (dest, rel source) per current page, deleted the rel sources that are gone.
+    if inventory is None:
+        inventory = SiteInventory.scan(dir_path_content)
+    template_hash = hash_file(template_path)
+    # basepath, output options and the rendering code itself, so an upgrade that renders differently
+    # (e.g. escaping added to the serializer) rebuilds every page, as it empties the block cache
+    basepath_hash = hash_bytes(basepath + ("\0minify" if minify_enabled() else "") + "\0" + renderer_fingerprint())
+    # a changed template, basepath or renderer makes every page stale, but the old entries are kept for deletion tracking
+    rebuild_all = full or manifest.template != template_hash or manifest.basepath != basepath_hash
+    manifest.template = template_hash
+    manifest.basepath = basepath_hash
+    # assets whose hashed name moved since the last build: pages linking them (or all pages, when the
+    # template does) are stale even if their source isn't
+    assets = _assets if _assets is not None else AssetMap()
+    changed_assets = assets.changed(manifest.assets)
+    if any(path in load_template(template_path).source for path in changed_assets):
+        rebuild_all = True
+    manifest.assets = assets.mapping
+    # the same for images whose intrinsic size changed; turning lazy loading on or off touches every image
+    images = _images if _images is not None else ImageAttributes()
+    changed_assets |= images.changed(manifest.images)
+    if images.lazy != manifest.images.get("lazy", False):
+        rebuild_all = True
+    manifest.images = images.state()
+
+    pages = inventory.pages(dest_dir_path)
+    if shard is not None:
+        # pages of other shards count as deleted here
+        assignment = assign_shards({site_file.rel_path: site_file.stat.st_size for site_file, _ in pages}, shard[1])
+        pages = [page for page in pages if assignment[page[0].rel_path] == shard[0]]
+    search_index = SearchIndex(dest_dir_path, manifest) if search_enabled() else None
+    if search_index is not None and not search_index.is_complete(site_file.rel_path for site_file, _ in pages):
+        rebuild_all = True # an unchanged page's terms aren't kept anywhere but the index itself
+
+    seen = set()
+    dirty = []
+    skipped = []
+    for site_file, dest_path in pages:
+        rel_source = site_file.rel_path
+        seen.add(rel_source)
+        source_hash = manifest.source_hash(rel_source, site_file.path, site_file.stat)
+        if not rebuild_all and manifest.page_is_current(rel_source, source_hash, dest_path) and not _links_changed(manifest.pages[rel_source], changed_assets):
+            skipped.append((dest_path, rel_source))
+            continue
+        dirty.append((site_file.path, dest_path, rel_source, source_hash, site_file.stat))
+    deleted = [rel_source for rel_source in manifest.pages if rel_source not in seen]
+    return dirty, skipped, deleted
+
+def generate_pages_incremental(basepath, dir_path_content, template_path, dest_dir_path, full=False, jobs=1, manifest=None, report=None, shard=None, inventory=None):
+    # shard: (i, N) to build only this node's share of the pages, see shards.py and merge_shards
+    if manifest is None:
+        manifest = BuildManifest.load(manifest_path(dest_dir_path))
+    dirty, skipped, deleted = plan_pages(basepath, dir_path_content, template_path, dest_dir_path, manifest, full, shard, inventory)
+    for dest_path, rel_source in skipped:
+        record_output(dest_path, False)
+        precompress(dest_path, manifest.pages[rel_source]["output"]) # no-op unless its siblings are missing
+
+    rendered = render_pages(basepath, [(page[0], page[1]) for page in dirty], template_path, jobs, report)
+    indexed = {}
+    for (source_path, dest_path, rel_source, source_hash, stat), (output_hash, links, terms, document) in zip(dirty, rendered):
+        rel_dest = os.path.relpath(dest_path, dest_dir_path)
+        manifest.record_page(rel_source, source_path, source_hash, rel_dest, output_hash, stat, links, document)
+        if terms is not None:
+            indexed[rel_source] = (rel_dest, *terms)
+    built = len(dirty)
+
+    removed = 0
+    for rel_source in deleted:
+        stale_dest = os.path.join(dest_dir_path, manifest.pages[rel_source]["dest"])
+        if remove_output(stale_dest):
+            if shard is not None and os.path.exists(os.path.join(dir_path_content, rel_source)):
+                print(f"Removing {stale_dest} (source {rel_source} belongs to another shard)")
+            else:
+                print(f"Removing {stale_dest} (source {rel_source} was deleted)")
+        remove_compressed(stale_dest)
+        del manifest.pages[rel_source]
+        removed += 1
+    update_search_index(dest_dir_path, manifest, indexed, deleted)
+
+    manifest.save()
+    print(f"\n{built} pages built, {len(skipped)} unchanged, {removed} removed.")
+    return built, len(skipped), removed
+
+def _same_file(path, other_path):
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+    except OSError:
+        return False
+    return hash_file(path) == hash_file(other_path)
+
+def merge_shards(shard_dirs, dest_dir, content_dir):
+    # Combines the output dirs (and manifests) of a --shard build into dest_dir. Every page must come
+    # from exactly one shard and every source in content_dir must be covered; a path more than one shard
+    # wrote (static files, which each shard copies) must be identical everywhere. Nothing is copied
+    # unless all of that holds. Returns (copied, unchanged, removed).
+    problems = []
+    manifests = []
+    for shard_dir in shard_dirs:
+        shard_manifest = BuildManifest.load(manifest_path(shard_dir))
+        if shard_manifest.template is None:
+            problems.append(f"{shard_dir}: no build manifest")
+        manifests.append(shard_manifest)
+    if problems:
+        raise ShardMergeError(problems)
+    for field in ("template", "basepath", "assets", "images"):
+        if any(getattr(shard_manifest, field) != getattr(manifests[0], field) for shard_manifest in manifests):
+            problems.append(f"shards were built with different {field} settings")
+
+    owners = {} # rel output path -> shard dir it is copied from
+    for shard_dir in shard_dirs:
+        for rel_path in SiteInventory.scan(shard_dir, stat=False).files:
+            owner = owners.setdefault(rel_path, shard_dir)
+            if owner != shard_dir and not _same_file(os.path.join(owner, rel_path), os.path.join(shard_dir, rel_path)):
+                problems.append(f"{rel_path}: differs between {owner} and {shard_dir}")
+
+    pages = {}
+    for shard_dir, shard_manifest in zip(shard_dirs, manifests):
+        for rel_source, entry in shard_manifest.pages.items():
+            if rel_source in pages:
+                problems.append(f"{rel_source}: rendered by more than one shard")
+            pages[rel_source] = entry
+            if entry["dest"] not in owners:
+                problems.append(f"{entry['dest']}: in the manifest of {shard_dir} but not in its output")
+    for source_path, _ in collect_pages(content_dir, dest_dir):
+        rel_source = os.path.relpath(source_path, content_dir)
+        if rel_source not in pages:
+            problems.append(f"{rel_source}: not rendered by any shard")
+    if problems:
+        raise ShardMergeError(problems)
+
+    manifest = BuildManifest.load(manifest_path(dest_dir))
+    previous = {entry["dest"] for entry in manifest.pages.values()}
+    previous.update(entry.get("dest", rel_path) for rel_path, entry in manifest.static.items())
+    previous.update(manifest.compressed)
+    copied = unchanged = removed = 0
+    for rel_path, shard_dir in sorted(owners.items()):
+        source_path = os.path.join(shard_dir, rel_path)
+        dest_path = os.path.join(dest_dir, rel_path)
+        if _same_file(source_path, dest_path):
+            unchanged += 1
+            record_output(dest_path, False)
+            continue
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(source_path, dest_path)
+        record_output(dest_path, True)
+        copied += 1
+    for rel_path in sorted(previous - set(owners)):
+        stale = os.path.join(dest_dir, rel_path)
+        if remove_output(stale):
+            removed += 1
+            _remove_empty_parents(os.path.dirname(stale), dest_dir)
+
+    first = manifests[0]
+    manifest.template = first.template
+    manifest.basepath = first.basepath
+    manifest.assets = first.assets
+    manifest.images = first.images
+    manifest.static = first.static
+    manifest.pages = pages
+    manifest.compressed = {}
+    manifest.image_sizes = {}
+    for shard_manifest in manifests:
+        manifest.compressed.update(shard_manifest.compressed)
+        manifest.image_sizes.update(shard_manifest.image_sizes)
+    manifest.search = {}
+    manifest.save()
+    print(f"\nMerged {len(shard_dirs)} shards: {len(pages)} pages, {copied} files copied, {unchanged} unchanged, {removed} removed.")
+    return copied, unchanged, removed
+
+def update_search_index(dest_dir, manifest, indexed, deleted):
+    # indexed: rel source -> (rel dest, title, term counts) for pages just rendered
+    if search_enabled():
+        SearchIndex(dest_dir, manifest).update(indexed, deleted)
+    elif manifest.search:
+        SearchIndex.drop(dest_dir, manifest) # left over from a build with --search
 
+def _links_changed(entry, changed_assets):
+    if not changed_assets:
+        return False
+    return any(urlsplit(link).path in changed_assets for link in entry.get("links") or [])
 
+def report_broken_links(manifest):
+    # checked against the whole site as recorded in the manifest, so unchanged pages count too
+    broken = check_manifest_links(manifest)
+    for rel_dest, url in broken:
+        print(f"Broken link in {rel_dest}: {url}")
+    if broken:
+        print(f"\n{len(broken)} broken internal links.")
+    return broken
@@ -1,4 +1,48 @@
+import re
+
+WHITESPACE = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]") # lone spaces already are minimal, so they aren't matched
+UNQUOTED_VALUE = re.compile(r"[^ \t\n\r\f\"'=<>`]+") # what HTML allows in an attribute value without quotes
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style")) # whitespace inside these is content
+
+def collapse_whitespace(text):
+    # most text has nothing to collapse, and these substring checks are much cheaper than the regex scan
+    if "  " not in text and "\n" not in text and "\t" not in text and "\r" not in text and "\f" not in text:
+        return text
+    return WHITESPACE.sub(" ", text)
+
+# (character, entity) tables, "&" first so the entities themselves aren't escaped again; chained
+# str.replace is an order of magnitude faster than str.translate with multi-character replacements
+TEXT_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")) # text and code content
+ATTRIBUTE_ESCAPES = TEXT_ESCAPES + (("\"", "&quot;"),) # double-quoted values
+
+def _escape(text, table):
+    for char, entity in table:
+        if char in text:
+            text = text.replace(char, entity)
+    return text
+
+def escape_text(text):
+    # most text has nothing to escape, and these substring checks are much cheaper than the table walk
+    if "&" not in text and "<" not in text and ">" not in text:
+        return text
+    return _escape(text, TEXT_ESCAPES)
+
+def escape_attribute(value):
+    if "&" not in value and "<" not in value and ">" not in value and "\"" not in value:
+        return value
+    return _escape(value, ATTRIBUTE_ESCAPES)
+
+def minified_attribute(name, value):
+    value = escape_attribute(value)
+    if UNQUOTED_VALUE.fullmatch(value):
+        return f" {name}={value}"
+    return f" {name}=\"{value}\""
+
+
 class HTMLNode():
+    # slotted: pages produce a lot of nodes, and a per-instance __dict__ costs more than the data it holds
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
             self, 
             tag: str = None, 
@@ -29,17 +73,40 @@ class HTMLNode():
         return f"HTMLNode(\n{tagstr}\n{valuestr}\n{childstr}\n{propstr})"
 
     def to_html(self):
+        parts = []
+        self.emit_html(parts.append)
+        return "".join(parts)
+
+    def write_html(self, sink):
+        # streams the serialized node into any file-like object instead of building one big string
+        self.emit_html(sink.write)
+
+    def emit_html(self, write):
+        raise NotImplementedError
+
+    def to_minified_html(self):
+        parts = []
+        self.emit_minified(parts.append)
+        return "".join(parts)
+
+    def emit_minified(self, write, preformatted=False):
+        # emit_html with whitespace runs collapsed (except under PRESERVE_TAGS) and unquoted attributes where allowed
         raise NotImplementedError
 
     def props_to_html(self):
-        prophtml = ""
-        if self.props != None:
-            for prop in self.props:
-                prophtml += f" {prop}=\"{self.props[prop]}\""
-        return prophtml
+        if not self.props:
+            return ""
+        return "".join([f" {prop}=\"{escape_attribute(str(self.props[prop]))}\"" for prop in self.props])
+
+    def props_to_minified_html(self):
+        if not self.props:
+            return ""
+        return "".join([minified_attribute(prop, str(self.props[prop])) for prop in self.props])
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
             self, 
             tag: str, 
@@ -52,12 +119,42 @@ class LeafNode(HTMLNode):
         if self.value == None:
             raise ValueError("LeafNodes must have a value")
         if self.tag == None:
-            return str(self.value)
+            return escape_text(str(self.value))
+        else:
+            return f"<{self.tag}{self.props_to_html()}>{escape_text(str(self.value))}</{self.tag}>"
+
+    def emit_html(self, write):
+        write(self.to_html())
+
+    def emit_minified(self, write, preformatted=False):
+        if self.value == None:
+            raise ValueError("LeafNodes must have a value")
+        value = escape_text(str(self.value))
+        if not preformatted and self.tag not in PRESERVE_TAGS:
+            value = collapse_whitespace(value)
+        if self.tag == None:
+            write(value)
         else:
-            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            write(f"<{self.tag}{self.props_to_minified_html()}>{value}</{self.tag}>")
+
+
+class RawHTMLNode(LeafNode):
+    # already-serialized HTML (e.g. a block from the render cache), written as-is in both modes
+    __slots__ = ()
+
+    def __init__(self, html: str):
+        super().__init__(None, html)
+
+    def to_html(self):
+        return self.value
+
+    def emit_minified(self, write, preformatted=False):
+        write(self.value)
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -66,13 +163,23 @@ class ParentNode(HTMLNode):
     ):
         super().__init__(tag, children=children, props=props)
 
-    def to_html(self):
+    def emit_html(self, write):
+        if self.tag == None:
+            raise ValueError("ParentNodes must have a tag")
+        if self.children == None:
+            raise ValueError("ParentNodes must have children")
+        write(f"<{self.tag}{self.props_to_html()}>")
+        for child in self.children:
+            child.emit_html(write)
+        write(f"</{self.tag}>")
+
+    def emit_minified(self, write, preformatted=False):
         if self.tag == None:
             raise ValueError("ParentNodes must have a tag")
         if self.children == None:
             raise ValueError("ParentNodes must have children")
-        htmlstr = f"<{self.tag}{self.props_to_html()}>"
+        preformatted = preformatted or self.tag in PRESERVE_TAGS
+        write(f"<{self.tag}{self.props_to_minified_html()}>")
         for child in self.children:
-            htmlstr += child.to_html()
-        htmlstr += f"</{self.tag}>"
-        return htmlstr
\ No newline at end of file
+            child.emit_minified(write, preformatted)
+        write(f"</{self.tag}>")
@@ -0,0 +1,120 @@
+import os, mmap, json, struct
+
+from manifest import hash_bytes, hash_file
+
+HEADER_BYTES = 64 # enough for PNG, GIF and WebP; JPEG is scanned through mmap instead
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+# start-of-frame markers carry the size; C4 (DHT), C8 (JPG) and CC (DAC) share the range but don't
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _png_size(header):
+    if header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+def _gif_size(header):
+    return struct.unpack("<HH", header[6:10])
+
+def _webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and len(header) >= 30: # lossy: 14-bit sizes after the frame start code
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(header) >= 25: # lossless: two packed 14-bit sizes, stored minus one
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(header) >= 30: # extended: 24-bit sizes, stored minus one
+        return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+    return None
+
+def _jpeg_size(data):
+    # walks the segment headers until a start-of-frame; EXIF/ICC segments ahead of it can be large,
+    # but only their two-byte lengths are read
+    position = 2
+    end = len(data)
+    while position + 4 <= end:
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF: # fill byte
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9: # markers without a length
+            position += 2
+            continue
+        length = struct.unpack(">H", data[position + 2:position + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if position + 9 > end:
+                return None
+            height, width = struct.unpack(">HH", data[position + 5:position + 9])
+            return width, height
+        position += 2 + length
+    return None
+
+def image_size(path):
+    # (width, height) from the file header, or None for unknown formats and truncated files
+    with open(path, "rb") as f:
+        header = f.read(HEADER_BYTES)
+        if header.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _png_size(header) if len(header) >= 24 else None
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return _gif_size(header) if len(header) >= 10 else None
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return _webp_size(header)
+        if header[:2] == b"\xff\xd8":
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _jpeg_size(data)
+    return None
+
+
+class ImageAttributes():
+    # extra <img> props for site images: intrinsic width/height, and optionally lazy loading
+    def __init__(self, sizes=None, lazy=False):
+        self.sizes = sizes or {} # "/images/tom.png" -> [width, height]
+        self.lazy = lazy
+        self.digest = hash_bytes(json.dumps([self.sizes, lazy], sort_keys=True))
+
+    @classmethod
+    def from_static(cls, static_dir, manifest, lazy=False):
+        # Sizes for every image in static/. manifest.image_sizes caches them by content hash, and the
+        # hash itself is kept on the manifest's static entry, which sync_static carries over while
+        # the file is unchanged; so an incremental build reads no image data at all.
+        sizes = {}
+        for rel_path, entry in manifest.static.items():
+            if not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            source_path = os.path.join(static_dir, rel_path)
+            if not entry.get("hash"):
+                entry["hash"] = hash_file(source_path)
+            size = manifest.image_sizes.get(entry["hash"])
+            if size is None:
+                size = image_size(source_path)
+                if size is None:
+                    continue
+                size = manifest.image_sizes[entry["hash"]] = list(size)
+            sizes["/" + rel_path.replace(os.sep, "/")] = size
+        live = {entry.get("hash") for entry in manifest.static.values()}
+        for content_hash in list(manifest.image_sizes):
+            if content_hash not in live:
+                del manifest.image_sizes[content_hash]
+        return cls(sizes, lazy)
+
+    def props(self, url):
+        props = {}
+        size = self.sizes.get(url.split("?", 1)[0].split("#", 1)[0])
+        if size is not None:
+            props["width"] = str(size[0])
+            props["height"] = str(size[1])
+        if self.lazy:
+            props["loading"] = "lazy"
+            props["decoding"] = "async"
+        return props
+
+    def state(self):
+        return {"sizes": self.sizes, "lazy": self.lazy}
+
+    def changed(self, old_state):
+        # image urls whose size differs from the previous build's (a change of `lazy` affects every page)
+        old_sizes = old_state.get("sizes", {})
+        keys = set(self.sizes) | set(old_sizes)
+        return {key for key in keys if self.sizes.get(key) != old_sizes.get(key)}
@@ -0,0 +1,192 @@
+import os, json, time, tracemalloc
+
+from htmlnode import escape_text
+from utilities import *
+from links import UrlRewriter
+import utilities
+
+STAGES = ("read", "block_split", "block_classify", "inline_parse", "serialize", "template", "write", "static_copy")
+
+
+class StageTimer():
+    # Times one page of the real pipeline: generate_page and the parser call lap() at each stage
+    # boundary (see utilities.configure_stage_timer). The stages of a streamed page interleave, so each
+    # stage's total is summed over every stretch charged to it.
+    def __init__(self, trace_memory=False):
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start() # once per process, so pool workers start it on their first page
+            tracemalloc.reset_peak()
+            self.memory_base = tracemalloc.get_traced_memory()[0]
+        else:
+            self.memory_base = None
+        self.stages = {}
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        # charges the time since the previous lap to `stage`
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+    def writer(self, sink):
+        return TimedWriter(self, sink)
+
+    def page_record(self, from_path, dest_path):
+        return {
+            "page": from_path,
+            "seconds": time.perf_counter() - self.start,
+            "bytes_in": os.path.getsize(from_path),
+            "bytes_out": os.path.getsize(dest_path),
+            "peak_memory": tracemalloc.get_traced_memory()[1] - self.memory_base if self.memory_base is not None else 0,
+            "stages": self.stages,
+        }
+
+
+class TimedWriter():
+    # sits in front of the output file: time spent producing a chunk is "serialize", handing it over is "write"
+    def __init__(self, timer, sink):
+        self.timer = timer
+        self.sink = sink
+
+    def write(self, text):
+        self.timer.lap("serialize")
+        written = self.sink.write(text)
+        self.timer.lap("write")
+        return written
+
+
+def measure_minify(basepath, from_path, template, assets=None, images=None, bytes_out=0):
+    # What --minify cost and saved on one page: the markdown is parsed again without the block cache and
+    # serialized both ways. Runs after the page is written, outside its stage timings, with its own url
+    # rewriter so the page's link targets aren't recorded twice.
+    previous = utilities._url_rewriter
+    configure_url_rewriter(UrlRewriter(basepath, assets, images))
+    try:
+        with open(from_path, "r", encoding="utf-8") as f:
+            document = parse_document(f.read())
+        start = time.perf_counter()
+        plain_html = document.body.to_html()
+        plain_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        document.body.to_minified_html()
+        minified_seconds = time.perf_counter() - start
+        title = escape_text(document.require_title())
+    finally:
+        configure_url_rewriter(previous)
+    plain_size = len(template.render({"Title": title, "Content": plain_html}, basepath, assets).encode("utf-8"))
+    return {"minify_bytes_saved": plain_size - bytes_out, "minify_seconds": minified_seconds - plain_seconds}
+
+
+class BuildReport():
+    def __init__(self, root=None):
+        self.root = root # page paths are reported relative to this
+        self.pages = []
+        self.stage_totals = dict.fromkeys(STAGES, 0.0)
+        self.static_bytes = 0
+        self.block_cache = None
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    def add_page(self, record):
+        if self.root:
+            record["page"] = os.path.relpath(record["page"], self.root)
+        self.pages.append(record)
+        for stage, seconds in record["stages"].items():
+            self.stage_totals[stage] += seconds
+
+    def add_stage(self, stage, seconds):
+        self.stage_totals[stage] += seconds
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.start
+
+    def slowest(self, top=10):
+        return sorted(self.pages, key=lambda record: record["seconds"], reverse=True)[:top]
+
+    def minify_summary(self):
+        # totals over pages built with --minify, or None; extra_seconds can come out negative
+        minified = [record for record in self.pages if "minify_bytes_saved" in record]
+        if not minified:
+            return None
+        return {
+            "pages": len(minified),
+            "bytes_saved": sum(record["minify_bytes_saved"] for record in minified),
+            "extra_seconds": sum(record["minify_seconds"] for record in minified),
+        }
+
+    def to_dict(self, top=10):
+        return {
+            "wall_seconds": self.elapsed,
+            "pages_built": len(self.pages),
+            "bytes_in": sum(record["bytes_in"] for record in self.pages),
+            "bytes_out": sum(record["bytes_out"] for record in self.pages),
+            "peak_memory": max([record["peak_memory"] for record in self.pages], default=0),
+            "static_bytes": self.static_bytes,
+            "stage_seconds": self.stage_totals,
+            "block_cache": self.block_cache,
+            "minify": self.minify_summary(),
+            "slowest_pages": self.slowest(top),
+            "pages": self.pages,
+        }
+
+    def to_openmetrics(self, top=10):
+        summary = self.to_dict(top)
+        lines = [
+            "# HELP ssg_stage_seconds Time spent in each build stage, summed over pages.",
+            "# TYPE ssg_stage_seconds gauge",
+        ]
+        for stage, seconds in self.stage_totals.items():
+            lines.append(f'ssg_stage_seconds{{stage="{stage}"}} {seconds:.6f}')
+        for name, key, help_text in [
+            ("ssg_build_seconds", "wall_seconds", "Wall time of the whole build."),
+            ("ssg_pages_built", "pages_built", "Pages rendered in this build."),
+            ("ssg_bytes_in", "bytes_in", "Markdown bytes read for rendered pages."),
+            ("ssg_bytes_out", "bytes_out", "HTML bytes written for rendered pages."),
+            ("ssg_static_bytes", "static_bytes", "Static asset bytes copied."),
+            ("ssg_page_peak_memory_bytes", "peak_memory", "Largest per-page peak of traced memory."),
+        ]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {summary[key] or 0}")
+        if summary["minify"]:
+            for name, key, help_text in [
+                ("ssg_minify_bytes_saved", "bytes_saved", "Output bytes removed by --minify."),
+                ("ssg_minify_extra_seconds", "extra_seconds", "Serialization time --minify added over the plain serializer."),
+            ]:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {summary['minify'][key]}")
+        if self.block_cache:
+            lines.append("# HELP ssg_block_cache_lookups Block cache lookups by result.")
+            lines.append("# TYPE ssg_block_cache_lookups gauge")
+            for result in ("hits", "disk_hits", "misses"):
+                lines.append(f'ssg_block_cache_lookups{{result="{result}"}} {self.block_cache[result]}')
+        lines.append("# HELP ssg_slowest_page_seconds Wall time of the slowest pages.")
+        lines.append("# TYPE ssg_slowest_page_seconds gauge")
+        for record in summary["slowest_pages"]:
+            page = record["page"].replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'ssg_slowest_page_seconds{{page="{page}"}} {record["seconds"]:.6f}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, top=10):
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, "build-report.json")
+        metrics_path = os.path.join(directory, "build-metrics.txt")
+        with open(json_path, "w") as f:
+            json.dump(self.to_dict(top), f, indent=2)
+        with open(metrics_path, "w") as f:
+            f.write(self.to_openmetrics(top))
+        return json_path, metrics_path
+
+    def print_summary(self, top=5):
+        total = sum(self.stage_totals.values()) or 1
+        print(f"\nBuild took {self.elapsed:.3f}s for {len(self.pages)} pages")
+        for stage, seconds in self.stage_totals.items():
+            print(f"  {stage:<15} {seconds * 1e3:10.1f} ms  {seconds / total * 100:5.1f}%")
+        minify = self.minify_summary()
+        if minify:
+            print(f"  minify saved {minify['bytes_saved']} bytes over {minify['pages']} pages for {minify['extra_seconds'] * 1e3:+.1f} ms")
+        for record in self.slowest(top):
+            print(f"  slow: {record['page']} {record['seconds'] * 1e3:.1f} ms")
@@ -0,0 +1,59 @@
+import os
+
+class SiteFile():
+    __slots__ = ("path", "rel_path", "stat")
+
+    def __init__(self, path, rel_path, stat):
+        self.path = path
+        self.rel_path = rel_path
+        self.stat = stat # os.stat_result, or None for a names-only scan
+
+
+class SiteInventory():
+    # Every file under a root from one os.scandir walk. The entry type comes with the directory listing,
+    # so the only syscall per file is the stat that size and mtime need anyway (none at all with
+    # stat=False). Static sync, page rendering, the incremental checks, --dry-run and the watcher all
+    # read one of these instead of walking the tree themselves.
+    def __init__(self, root):
+        self.root = root
+        self.files = {} # rel path -> SiteFile, sorted by path
+        self.dirs = [] # rel paths of every subdirectory, sorted, so parents come before children
+
+    @classmethod
+    def scan(cls, root, stat=True):
+        # a missing root is just an empty inventory
+        inventory = cls(root)
+        files = []
+        stack = [(root, "")]
+        while stack:
+            path, rel_dir = stack.pop()
+            try:
+                entries = os.scandir(path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with entries:
+                for entry in entries:
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        inventory.dirs.append(rel_path)
+                        stack.append((entry.path, rel_path))
+                    elif entry.is_file():
+                        try:
+                            files.append(SiteFile(entry.path, rel_path, entry.stat() if stat else None))
+                        except FileNotFoundError:
+                            continue # deleted between listing and stat
+        files.sort(key=lambda site_file: site_file.rel_path)
+        inventory.files = {site_file.rel_path: site_file for site_file in files}
+        inventory.dirs.sort()
+        return inventory
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, rel_path):
+        return rel_path in self.files
+
+    def pages(self, dest_dir):
+        # (SiteFile, dest) for every markdown file: content/blog/post.md -> docs/blog/post.html
+        return [(site_file, os.path.join(dest_dir, site_file.rel_path[:-3] + ".html"))
+                for site_file in self.files.values() if site_file.rel_path.endswith(".md")]
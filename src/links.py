@@ -0,0 +1,105 @@
+import posixpath
+from urllib.parse import urlsplit
+
+import utilities
+
+def is_internal(url):
+    # site-local targets only: no scheme, not protocol-relative, not a bare #fragment
+    if not url or url.startswith("#") or url.startswith("//"):
+        return False
+    return urlsplit(url).scheme == ""
+
+
+class UrlRewriter():
+    # applied to link and image targets as text_node_to_html_node creates them (see
+    # utilities.configure_url_rewriter); also remembers every internal target for link checking
+    def __init__(self, basepath="/", assets=None, images=None):
+        self.basepath = basepath
+        self.assets = assets # an assets.AssetMap when static files are fingerprinted
+        self.images = images # an imagesize.ImageAttributes when <img> gets sizes
+        self.seen = []
+        # rendered HTML depends on these, so block cache keys do too
+        salt = [basepath] if basepath != "/" else []
+        salt += [option.digest for option in (assets, images) if option is not None]
+        self.cache_salt = "".join(salt)
+
+    def __call__(self, url):
+        if not is_internal(url):
+            return url
+        self.seen.append(url)
+        if self.assets is not None:
+            url = self.assets.url(url)
+        if self.basepath != "/" and url.startswith("/"):
+            return self.basepath + url[1:]
+        return url
+
+    def image_props(self, url, alt):
+        props = {"src": self(url), "alt": alt}
+        if self.images is not None:
+            props.update(self.images.props(url))
+        return props
+
+    def take(self):
+        seen, self.seen = self.seen, []
+        return seen
+
+
+_rewriter = None
+
+def page_url_rewriter(basepath, assets=None, images=None):
+    # the rewriter for this process, installed on first use and replaced if any of its options
+    # change; anything left over from the previous page is dropped
+    global _rewriter
+    if (_rewriter is None or _rewriter.basepath != basepath or _rewriter.assets is not assets
+            or _rewriter.images is not images or utilities._url_rewriter is not _rewriter):
+        _rewriter = UrlRewriter(basepath, assets, images)
+        utilities.configure_url_rewriter(_rewriter)
+    _rewriter.take()
+    return _rewriter
+
+def take_page_links():
+    # internal link targets seen since the current page started
+    return _rewriter.take() if _rewriter is not None else []
+
+
+class LinkIndex():
+    # every path the built site can serve, collected from the manifest instead of crawling docs/
+    def __init__(self):
+        self.targets = set()
+
+    def add_output(self, rel_path):
+        path = "/" + rel_path.replace("\\", "/")
+        self.targets.add(path)
+        if path.endswith("/index.html"):
+            directory = path[:-len("index.html")]
+            self.targets.add(directory)
+            self.targets.add(directory.rstrip("/") or "/")
+
+    def resolve(self, page_rel_dest, url):
+        path = urlsplit(url).path
+        if not path:
+            return None # "?query" or similar, points back at the page itself
+        if not path.startswith("/"):
+            page_dir = posixpath.dirname("/" + page_rel_dest.replace("\\", "/"))
+            path = posixpath.join(page_dir, path)
+        trailing = "/" if path.endswith("/") else ""
+        return posixpath.normpath(path) + trailing if path != "/" else "/"
+
+    def broken_links(self, page_links):
+        # page_links: rel_dest -> list of internal urls; returns [(rel_dest, url)] whose target doesn't exist
+        broken = []
+        for rel_dest, urls in page_links.items():
+            for url in urls:
+                target = self.resolve(rel_dest, url)
+                if target is not None and target not in self.targets:
+                    broken.append((rel_dest, url))
+        return broken
+
+def check_manifest_links(manifest):
+    index = LinkIndex()
+    for entry in manifest.pages.values():
+        index.add_output(entry["dest"])
+    for rel_path in manifest.static:
+        index.add_output(rel_path)
+    page_links = {entry["dest"]: entry.get("links") or [] for entry in manifest.pages.values()}
+    return index.broken_links(page_links)
@@ -1,28 +1,230 @@
-import sys
+import sys, time, argparse
 
 from textnode import *
 from fileutilities import *
+from watch import SiteWatcher, serve
+from daemon import BuildDaemon, default_socket_path
+from instrumentation import BuildReport
+from blockcache import BlockCache
+from compress import Precompressor, MIN_SIZE
+from shards import parse_shard
 
 
-def main():
-    if not sys.argv[1]:
-        basepath = "/"
-    else:
-        basepath = sys.argv[1]
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into docs/.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix for site-absolute links (default: /)")
+    parser.add_argument("--full", action="store_true", help="ignore the build manifest and rebuild every page")
+    parser.add_argument("--changes", metavar="FILE", help="write the changed/deleted output paths of this build to FILE as JSON")
+    parser.add_argument("--output", metavar="DIR", help="build into DIR instead of docs/ (its manifest goes next to it)")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N", help="render only shard i of N (pages split by source size); combine the outputs with --merge")
+    parser.add_argument("--merge", nargs="+", metavar="DIR", help="merge the outputs of --shard builds into docs/ (or --output) instead of building")
+    parser.add_argument("--dry-run", action="store_true", help="print what a build would copy, render and remove, without writing anything")
+    parser.add_argument("--verify-static", action="store_true", help="compare static file contents when only the mtime differs")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N", help="render pages in N worker processes (0 = one per CPU)")
+    parser.add_argument("--report", metavar="DIR", help="time each build stage and write build-report.json and build-metrics.txt to DIR")
+    parser.add_argument("--block-cache", metavar="PATH", help="keep rendered blocks in this SQLite file between builds")
+    parser.add_argument("--block-cache-mb", type=int, default=64, help="size bound of the in-memory block cache (default: 64)")
+    parser.add_argument("--stream-mb", type=int, default=STREAM_THRESHOLD >> 20, help="stream sources at least this many MB block by block (default: %(default)s)")
+    parser.add_argument("--fingerprint-assets", action="store_true", help="write static assets to content-hashed names and link those")
+    parser.add_argument("--precompress", action="store_true", help="write .gz (and .zst/.br when available) next to HTML, CSS and text outputs")
+    parser.add_argument("--precompress-min-bytes", type=int, default=MIN_SIZE, help="skip outputs smaller than this (default: %(default)s)")
+    parser.add_argument("--image-sizes", action="store_true", help="add intrinsic width/height to images from static/")
+    parser.add_argument("--lazy-images", action="store_true", help="also add loading=\"lazy\" and decoding=\"async\" to images")
+    parser.add_argument("--minify", action="store_true", help="collapse whitespace and drop optional attribute quotes in the output")
+    parser.add_argument("--search", action="store_true", help="write a sharded search index (and search.js) to docs/search/")
+    parser.add_argument("--daemon", action="store_true", help="stay running and take build requests from src/client.py over a Unix socket")
+    parser.add_argument("--socket", metavar="PATH", help="socket for --daemon (default: .build-daemon.sock in the repo root)")
+    parser.add_argument("--watch", action="store_true", help="after building, rebuild on changes and serve docs/ locally")
+    parser.add_argument("--port", type=int, default=8888, help="port for --watch's local server (default: 8888)")
+    args = parser.parse_args(argv)
+    if args.shard and not args.output:
+        parser.error("--shard needs --output: a shard only has its share of the pages, and would remove the rest from docs/")
+    if args.shard and args.search:
+        parser.error("--search can't be combined with --shard: each shard would only index its own pages")
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    return args
 
-    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+def site_paths(rootdir):
+    return {
+        "static": os.path.abspath(os.path.join(rootdir, "static")),
+        "content": os.path.abspath(os.path.join(rootdir, "content")),
+        "template": os.path.abspath(os.path.join(rootdir, "template.html")),
+        "docs": os.path.abspath(os.path.join(rootdir, "docs")),
+    }
+
+def configure_static_options(args, site, manifest):
+    # render options that depend on the static files, once manifest.static is current
+    if args.fingerprint_assets:
+        configure_assets(AssetMap.from_manifest(manifest))
+    if args.image_sizes or args.lazy_images:
+        configure_images(ImageAttributes.from_static(site["static"], manifest, args.lazy_images) if args.image_sizes else ImageAttributes(lazy=True))
+
+def sync_site_static(args, site, manifest, report=None, inventory=None):
+    # static/ into docs/, then the render options that come from it; every page render needs both first
+    counts = sync_static(site["static"], site["docs"], manifest, verify_hash=args.verify_static, report=report, fingerprint=args.fingerprint_assets, inventory=inventory)
+    configure_static_options(args, site, manifest)
+    return counts
+
+def build_site(args, site, manifest, precompressor=None, report=None, full=False):
+    # one build of the whole site; returns counts for the daemon's replies
+    basepath = args.basepath or "/"
+
+    # docs/ is never wiped, even for --full: rewriting identical files would change every mtime and
+    # make rsync/object-store uploads send the whole site again
+    changes = OutputChanges(site["docs"])
+    configure_output_changes(changes)
+
+    # one scan of each source tree, shared by the static sync and the page build
+    static_inventory = SiteInventory.scan(site["static"])
+    content_inventory = SiteInventory.scan(site["content"])
 
     # Copy static resources
-    static_source = os.path.join(rootdir, "static")
-    static_dest = os.path.join(rootdir, "docs")
-    copy_static(static_source, static_dest)
+    copied, unchanged, static_removed = sync_site_static(args, site, manifest, report, static_inventory)
 
     # Build and write HTML resources
-    from_path = os.path.abspath(os.path.join(rootdir, "content"))
-    template_path = os.path.abspath(os.path.join(rootdir, "template.html"))
-    dest_path = os.path.abspath(os.path.join(rootdir, "docs"))
-    generate_pages_recursively(basepath, from_path, template_path, dest_path)
+    built, skipped, removed = generate_pages_incremental(basepath, site["content"], site["template"], site["docs"], full=full, jobs=args.jobs, manifest=manifest, report=report, shard=args.shard, inventory=content_inventory)
+    # a shard only knows its own pages, so links are checked once the shards are merged
+    broken = report_broken_links(manifest) if args.shard is None else []
+    if precompressor is not None:
+        compressed, precompressed = finish_precompression()
+        print(f"Precompressed {compressed} outputs ({', '.join(precompressor.suffixes)}), {precompressed} unchanged.")
+    else:
+        drop_precompressed(site["docs"], manifest)
+    manifest.save()
+    configure_output_changes(None)
+    print(f"Output: {changes.summary()}.")
+    if args.changes:
+        print(f"Wrote {changes.write(args.changes)}")
+    return {
+        "static": {"copied": copied, "unchanged": unchanged, "removed": static_removed},
+        "pages": {"built": built, "unchanged": skipped, "removed": removed},
+        "broken_links": broken,
+        "output": changes.to_dict(),
+    }
+
+def dry_run(args, rootdir, site, manifest):
+    # the build plan from the inventories and the manifest alone; the manifest is changed in memory only
+    basepath = args.basepath or "/"
+    start = time.perf_counter()
+    static_inventory = SiteInventory.scan(site["static"])
+    content_inventory = SiteInventory.scan(site["content"])
+    scanned = time.perf_counter()
+    current, to_copy, unchanged, stale, _ = plan_static(site["static"], site["docs"], manifest, args.verify_static, fingerprint=args.fingerprint_assets, inventory=static_inventory)
+    manifest.static = current
+    configure_static_options(args, site, manifest)
+    dirty, skipped, deleted = plan_pages(basepath, site["content"], site["template"], site["docs"], manifest, args.full, args.shard, content_inventory)
+    planned = time.perf_counter()
+
+    def show(path):
+        return os.path.relpath(path, rootdir)
+    for source_path, dest_path in to_copy:
+        print(f"copy    {show(source_path)} -> {show(dest_path)}")
+    for stale_path in stale:
+        print(f"remove  {show(stale_path)}")
+    for source_path, dest_path, _, _, _ in dirty:
+        print(f"render  {show(source_path)} -> {show(dest_path)}")
+    for rel_source in deleted:
+        print(f"remove  {show(os.path.join(site['docs'], manifest.pages[rel_source]['dest']))}")
+    print(f"\nStatic: {len(to_copy)} to copy, {len(unchanged)} unchanged, {len(stale)} to remove.")
+    print(f"Pages: {len(dirty)} to render, {len(skipped)} unchanged, {len(deleted)} to remove.")
+    print(f"Scanned {len(static_inventory) + len(content_inventory)} files in {(scanned - start) * 1e3:.1f} ms, planned in {(planned - scanned) * 1e3:.1f} ms.")
+
+def merge_site(args, site):
+    changes = OutputChanges(site["docs"])
+    configure_output_changes(changes)
+    try:
+        merge_shards([os.path.abspath(path) for path in args.merge], site["docs"], site["content"])
+    except ShardMergeError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        configure_output_changes(None)
+    report_broken_links(BuildManifest.load(manifest_path(site["docs"])))
+    print(f"Output: {changes.summary()}.")
+    if args.changes:
+        print(f"Wrote {changes.write(args.changes)}")
+
+def run_daemon(args, rootdir, site, manifest, block_cache, precompressor):
+    # the same build, kept warm in one process and driven through src/client.py
+    basepath = args.basepath or "/"
+    # path builds and renders skip the static sync, so hashed asset names and image sizes are set up now
+    sync_site_static(args, site, manifest)
+    watcher = SiteWatcher(basepath, site["content"], site["static"], site["template"], site["docs"], manifest, args.fingerprint_assets, args.image_sizes, args.lazy_images)
+
+    def build(request):
+        paths = request.get("paths")
+        if not paths:
+            return build_site(args, site, manifest, precompressor, full=request.get("full", False))
+        # only what these paths affect, exactly as --watch would after a save
+        paths = [os.path.abspath(path) for path in paths]
+        changed = [path for path in paths if os.path.exists(path)]
+        deleted = [path for path in paths if not os.path.exists(path)]
+        return {"updated": watcher.rebuild(changed, deleted)}
+
+    def render(request):
+        template_path = site["template"] if request.get("page") else None
+        return {"html": render_markdown(basepath, request["markdown"], template_path)}
+
+    def stats(request):
+        return {"block_cache": block_cache.stats(), "pages": len(manifest.pages), "static": len(manifest.static)}
+
+    daemon = BuildDaemon(args.socket or default_socket_path(rootdir), {"build": build, "render": render, "stats": stats})
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
+    block_cache.close()
+
+def main():
+    args = parse_args(sys.argv[1:])
+    basepath = args.basepath or "/"
+
+    rootdir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    site = site_paths(rootdir)
+    if args.output:
+        site["docs"] = os.path.abspath(args.output)
+    if args.merge:
+        merge_site(args, site)
+        return
+    manifest = BuildManifest.load(manifest_path(site["docs"]))
+    block_cache = BlockCache(args.block_cache_mb << 20, args.block_cache)
+    configure_block_cache(block_cache)
+    configure_streaming(args.stream_mb << 20)
+    configure_minify(args.minify)
+    configure_search(args.search)
+    if args.dry_run:
+        dry_run(args, rootdir, site, manifest)
+        return
+    report = BuildReport(site["content"]) if args.report else None
+    precompressor = None
+    if args.precompress:
+        precompressor = Precompressor(site["docs"], manifest, args.precompress_min_bytes)
+        configure_precompression(precompressor)
+
+    if args.daemon:
+        run_daemon(args, rootdir, site, manifest, block_cache, precompressor)
+        return
+
+    build_site(args, site, manifest, precompressor, report, full=args.full)
+
+    stats = block_cache.stats()
+    print(f"Block cache: {stats['hits']} memory hits, {stats['disk_hits']} disk hits, {stats['misses']} misses ({stats['hit_rate'] * 100:.1f}% hit rate)")
+
+    if report is not None:
+        report.block_cache = stats
+        report.finish()
+        report.print_summary()
+        for path in report.write(args.report):
+            print(f"Wrote {path}")
+
+    if args.watch:
+        server = serve(site["docs"], args.port)
+        try:
+            SiteWatcher(basepath, site["content"], site["static"], site["template"], site["docs"], manifest, args.fingerprint_assets, args.image_sizes, args.lazy_images).run()
+        except KeyboardInterrupt:
+            server.shutdown()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
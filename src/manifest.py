@@ -0,0 +1,124 @@
+import hashlib, json, os
+
+MANIFEST_VERSION = 3
+
+def hash_bytes(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+class HashingWriter():
+    # file-like wrapper that hashes everything written through it
+    def __init__(self, sink):
+        self.sink = sink
+        self.hash = hashlib.sha256()
+
+    def write(self, text):
+        self.hash.update(text.encode("utf-8"))
+        return self.sink.write(text)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+def manifest_path(dest_dir):
+    # the manifest lives next to the output dir (docs/ -> docs.manifest.json) so copy_static never touches it
+    dest_dir = os.path.abspath(dest_dir).rstrip(os.sep)
+    return dest_dir + ".manifest.json"
+
+
+class BuildManifest():
+    def __init__(self, path):
+        self.path = path
+        self.template = None
+        self.basepath = None
+        self.pages = {} # relative source path -> {"mtime", "size", "source", "dest", "output", "links", "document"}
+        self.static = {} # relative static path -> {"mtime", "size", "hash"}, plus "dest" when fingerprinted
+        self.image_sizes = {} # image content hash -> [width, height]
+        self.images = {} # image attributes the pages were last rendered with, see ImageAttributes.state()
+        self.search = {} # search index state, see search.SearchIndex
+        self.compressed = {} # rel output path -> content key its .gz/.zst/.br siblings were made from
+        self.assets = {} # asset map the pages were last rendered with, "/index.css" -> "/index.<hash>.css"
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest # missing or unreadable manifest just means a full build
+        if data.get("version") != MANIFEST_VERSION:
+            return manifest
+        manifest.template = data.get("template")
+        manifest.basepath = data.get("basepath")
+        manifest.pages = data.get("pages", {})
+        manifest.static = data.get("static", {})
+        manifest.assets = data.get("assets", {})
+        manifest.compressed = data.get("compressed", {})
+        manifest.search = data.get("search", {})
+        manifest.image_sizes = data.get("image_sizes", {})
+        manifest.images = data.get("images", {})
+        return manifest
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "template": self.template,
+            "basepath": self.basepath,
+            "pages": self.pages,
+            "static": self.static,
+            "assets": self.assets,
+            "compressed": self.compressed,
+            "search": self.search,
+            "image_sizes": self.image_sizes,
+            "images": self.images,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(data, separators=(",", ":"), sort_keys=True)) # dumps+write is ~3x faster than json.dump on big manifests
+        os.replace(tmp_path, self.path)
+
+    def source_hash(self, rel_source, source_path, stat=None):
+        # skip re-hashing sources whose size and mtime haven't moved since the last build
+        if stat is None:
+            stat = os.stat(source_path)
+        entry = self.pages.get(rel_source)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+            return entry["source"]
+        return hash_file(source_path)
+
+    def page_is_current(self, rel_source, source_hash, dest_path):
+        entry = self.pages.get(rel_source)
+        if entry is None or entry.get("source") != source_hash:
+            return False
+        return os.path.exists(dest_path)
+
+    def record_page(self, rel_source, source_path, source_hash, rel_dest, output_hash, stat=None, links=(), document=None):
+        # links: the page's internal link targets, kept so unchanged pages are still link-checked;
+        # document: its ParsedDocument.summary()
+        if stat is None:
+            stat = os.stat(source_path)
+        self.pages[rel_source] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "source": source_hash,
+            "dest": rel_dest,
+            "output": output_hash,
+            "links": sorted(set(links)),
+            "document": document or {},
+        }
+
+    def documents(self):
+        # rel dest -> {"title", "headings", "metadata"} for every page as of its last render, so listings,
+        # tables of contents and feeds can be built without re-reading the sources
+        return {entry["dest"]: entry.get("document", {}) for entry in self.pages.values()}
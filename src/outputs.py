@@ -0,0 +1,101 @@
+import os, json
+
+from manifest import HashingWriter, hash_file
+
+_changes = None # OutputChanges set by configure_output_changes; every write and removal under docs/ is noted in it
+_last_written = False # whether the latest write_output replaced its file
+
+def configure_output_changes(changes):
+    global _changes
+    _changes = changes
+
+def record_output(path, written):
+    # for files put in place without write_output: copied assets, compressed siblings, pages rendered in
+    # worker processes (whose writes are recorded by the parent once their result comes back)
+    if _changes is not None:
+        _changes.record(path, written)
+
+def last_write_changed():
+    return _last_written
+
+def _same_content(path, size, content_hash):
+    try:
+        if os.path.getsize(path) != size:
+            return False
+    except OSError:
+        return False
+    return hash_file(path) == content_hash
+
+def write_output(path, emit):
+    # emit(writer) writes the file's text. It goes to a temp file that replaces `path` only when the
+    # content differs, so unchanged outputs keep their mtime and readers never see a partial file.
+    # Returns the content hash.
+    global _last_written
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f: # what HashingWriter hashes, whatever the locale
+            writer = HashingWriter(f)
+            emit(writer)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path) # don't leave a half-written file behind
+        raise
+    content_hash = writer.hexdigest()
+    _last_written = not _same_content(path, os.path.getsize(tmp_path), content_hash)
+    if _last_written:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    record_output(path, _last_written)
+    return content_hash
+
+def write_text_output(path, text):
+    return write_output(path, lambda writer: writer.write(text))
+
+def remove_output(path):
+    if not os.path.isfile(path):
+        return False
+    os.remove(path)
+    if _changes is not None:
+        _changes.remove(path)
+    return True
+
+
+class OutputChanges():
+    # What a build did to the output dir, as paths relative to it: deploy tooling can upload `changed`
+    # and delete `deleted` instead of syncing the whole site.
+    def __init__(self, dest_dir):
+        self.dest_dir = dest_dir
+        self.changed = set()
+        self.unchanged = set()
+        self.deleted = set()
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.dest_dir).replace(os.sep, "/")
+
+    def record(self, path, written):
+        rel_path = self._rel(path)
+        if written:
+            self.changed.add(rel_path)
+            self.unchanged.discard(rel_path)
+            self.deleted.discard(rel_path)
+        elif rel_path not in self.changed:
+            self.unchanged.add(rel_path)
+
+    def remove(self, path):
+        rel_path = self._rel(path)
+        self.changed.discard(rel_path)
+        self.unchanged.discard(rel_path)
+        self.deleted.add(rel_path)
+
+    def summary(self):
+        return f"{len(self.changed)} changed, {len(self.unchanged)} unchanged, {len(self.deleted)} deleted"
+
+    def to_dict(self):
+        return {"changed": sorted(self.changed), "unchanged": len(self.unchanged), "deleted": sorted(self.deleted)}
+
+    def write(self, path):
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(path + ".tmp", path)
+        return path
@@ -0,0 +1,207 @@
+import os, re, json, shutil
+from collections import Counter
+
+from outputs import write_text_output, remove_output
+
+SEARCH_DIR = "search" # under the output dir: pages.json, one <prefix>.json per shard, search.js
+PREFIX_LENGTH = 2
+TITLE_WEIGHT = 5
+TERM = re.compile(r"[^\W_]{2,}")
+LINK_TARGET = re.compile(r"\]\([^)]*\)") # the (url) half of links and images isn't prose
+STOPWORDS = frozenset("""
+an and are as at be but by for from has have he her his in is it its of on or our she that the their them they
+this to was were which will with you your
+""".split())
+
+_enabled = False # set by configure_search; page terms are only counted when the index is built
+_pending = None # (title, terms) of the page rendered last in this process
+
+def configure_search(enabled):
+    global _enabled
+    _enabled = enabled
+
+def search_enabled():
+    return _enabled
+
+def count_terms(lines, counts=None):
+    counts = Counter() if counts is None else counts
+    for line in lines:
+        for term in TERM.findall(LINK_TARGET.sub("](", line).lower()):
+            if term not in STOPWORDS:
+                counts[term] += 1
+    return counts
+
+def record_page_terms(title, lines):
+    # called while the page's text is in hand; the caller collects it with take_page_terms()
+    global _pending
+    if not _enabled:
+        return
+    counts = count_terms(lines)
+    for term in count_terms([title]):
+        counts[term] += TITLE_WEIGHT
+    _pending = (title, dict(counts))
+
+def take_page_terms():
+    global _pending
+    pending, _pending = _pending, None
+    return pending
+
+def shard_key(term):
+    # file-name safe prefix; anything outside a-z0-9 shares the "_" bucket for its position
+    return "".join(c if "a" <= c <= "z" or "0" <= c <= "9" else "_" for c in term[:PREFIX_LENGTH])
+
+def page_url(rel_dest):
+    path = "/" + rel_dest.replace(os.sep, "/")
+    if path.endswith("/index.html"):
+        return path[:-len("/index.html")] or "/"
+    return path
+
+def encode_postings(postings):
+    # {page id: count} -> [id, count, id, count, ...] sorted by id, ids delta-encoded so they stay short
+    flat = []
+    previous = 0
+    for page_id in sorted(postings):
+        flat.append(page_id - previous)
+        flat.append(postings[page_id])
+        previous = page_id
+    return flat
+
+def decode_postings(flat):
+    postings = {}
+    page_id = 0
+    for i in range(0, len(flat), 2):
+        page_id += flat[i]
+        postings[page_id] = flat[i + 1]
+    return postings
+
+
+class SearchIndex():
+    # An inverted index split into one small JSON file per term prefix, so a browser fetches only
+    # pages.json and the shard of each query term. manifest.search remembers page ids, titles and
+    # which shards each page is in, so an update rewrites only the shards its pages touch.
+    def __init__(self, dest_dir, manifest):
+        self.directory = os.path.join(dest_dir, SEARCH_DIR)
+        self.manifest = manifest
+        self.state = manifest.search if manifest.search.get("pages") is not None else {"next_id": 0, "pages": {}}
+
+    def is_complete(self, rel_sources):
+        # False when pages are missing from the index (first build, or search/ was deleted), so they get rebuilt
+        if not os.path.exists(os.path.join(self.directory, "pages.json")):
+            return False
+        return all(rel_source in self.state["pages"] for rel_source in rel_sources)
+
+    def update(self, changed, removed):
+        # changed: rel source -> (rel dest, title, terms); removed: rel sources
+        if not changed and not removed and os.path.exists(os.path.join(self.directory, "pages.json")):
+            return 0
+        pages = self.state["pages"]
+        stale_ids = set()
+        dirty = set()
+        for rel_source in list(changed) + list(removed):
+            entry = pages.get(rel_source)
+            if entry is not None:
+                stale_ids.add(entry["id"])
+                dirty.update(entry["shards"])
+        for rel_source in removed:
+            pages.pop(rel_source, None)
+
+        additions = {} # shard -> term -> {page id: count}
+        for rel_source, (rel_dest, title, terms) in changed.items():
+            entry = pages.get(rel_source)
+            if entry is None:
+                entry = {"id": self.state["next_id"]}
+                self.state["next_id"] += 1
+            shards = set()
+            for term, count in terms.items():
+                shard = shard_key(term)
+                shards.add(shard)
+                additions.setdefault(shard, {}).setdefault(term, {})[entry["id"]] = count
+            entry.update({"url": page_url(rel_dest), "title": title, "shards": sorted(shards)})
+            pages[rel_source] = entry
+            dirty.update(shards)
+
+        os.makedirs(self.directory, exist_ok=True)
+        for shard in dirty:
+            self._rewrite_shard(shard, stale_ids, additions.get(shard, {}))
+        table = {entry["id"]: [entry["url"], entry["title"]] for entry in pages.values()}
+        self._write("pages.json", {str(page_id): table[page_id] for page_id in sorted(table)})
+        self._write_script()
+        self.manifest.search = self.state
+        return len(dirty)
+
+    def _rewrite_shard(self, shard, stale_ids, additions):
+        path = os.path.join(self.directory, shard + ".json")
+        terms = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                terms = {term: decode_postings(flat) for term, flat in json.load(f).items()}
+        for term in list(terms):
+            postings = terms[term]
+            for page_id in stale_ids.intersection(postings):
+                del postings[page_id]
+            if not postings:
+                del terms[term]
+        for term, postings in additions.items():
+            terms.setdefault(term, {}).update(postings)
+        if terms:
+            self._write(shard + ".json", {term: encode_postings(terms[term]) for term in sorted(terms)})
+        else:
+            remove_output(path)
+
+    def _write(self, name, data):
+        write_text_output(os.path.join(self.directory, name), json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    def _write_script(self):
+        write_text_output(os.path.join(self.directory, "search.js"), SEARCH_SCRIPT)
+
+    @staticmethod
+    def drop(dest_dir, manifest):
+        # search turned off: remove the index an earlier build wrote
+        directory = os.path.join(dest_dir, SEARCH_DIR)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                remove_output(os.path.join(directory, name))
+            shutil.rmtree(directory)
+        manifest.search = {}
+
+
+# Browser side: search("base/path/search/", "query") resolves to [{url, title, score}], best first.
+# It mirrors count_terms and shard_key above.
+SEARCH_SCRIPT = """\
+const searchFiles = {};
+const searchStopwords = new Set(%s);
+async function searchShard(root, shard) {
+  if (!(shard in searchFiles)) {
+    searchFiles[shard] = fetch(root + shard + ".json").then(r => r.ok ? r.json() : {});
+  }
+  return searchFiles[shard];
+}
+function searchShardKey(term) {
+  return Array.from(term.slice(0, %d)).map(c => /[a-z0-9]/.test(c) ? c : "_").join("");
+}
+async function search(root, query) {
+  const terms = (query.toLowerCase().match(/[\\p{L}\\p{N}]{2,}/gu) || []).filter(term => !searchStopwords.has(term));
+  if (!terms.length) return [];
+  const pages = await searchShard(root, "pages");
+  let scores = null;
+  for (const term of terms) {
+    const shard = await searchShard(root, searchShardKey(term));
+    const flat = shard[term] || [];
+    const found = new Map();
+    for (let i = 0, id = 0; i < flat.length; i += 2) {
+      id += flat[i];
+      found.set(id, flat[i + 1]);
+    }
+    if (scores === null) {
+      scores = found;
+    } else {
+      for (const id of scores.keys()) {
+        if (found.has(id)) scores.set(id, scores.get(id) + found.get(id)); else scores.delete(id);
+      }
+    }
+  }
+  const site = new URL("..", new URL(root, location.href)).pathname; // urls in pages.json are site-relative
+  return Array.from(scores, ([id, score]) => ({url: site + pages[id][0].slice(1), title: pages[id][1], score}))
+    .sort((a, b) => b.score - a.score);
+}
+""" % (json.dumps(sorted(STOPWORDS)), PREFIX_LENGTH)
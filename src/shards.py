@@ -0,0 +1,29 @@
+import heapq, argparse
+
+def parse_shard(text):
+    # "2/4" -> (2, 4); shards are numbered from 1
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text!r} out of range, i must be between 1 and N")
+    return index, count
+
+def assign_shards(sizes, count):
+    # {rel source: size} -> {rel source: shard}. Largest pages first, each to the shard with the least
+    # source bytes so far (lowest number on a tie); every node computes the same split from the same
+    # checkout, so no coordination is needed.
+    loads = [(0, shard) for shard in range(1, count + 1)]
+    assignment = {}
+    for rel_source in sorted(sizes, key=lambda rel_source: (-sizes[rel_source], rel_source)):
+        load, shard = heapq.heappop(loads)
+        assignment[rel_source] = shard
+        heapq.heappush(loads, (load + sizes[rel_source], shard))
+    return assignment
+
+
+class ShardMergeError(Exception):
+    def __init__(self, problems):
+        super().__init__(f"{len(problems)} problems merging shards:\n" + "\n".join(problems))
+        self.problems = problems
@@ -0,0 +1,174 @@
+import os, re
+
+from htmlnode import collapse_whitespace, minified_attribute
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+
+def rewrite_root_urls(html, basepath):
+    if basepath == "/":
+        return html # nothing to rewrite, skip the copies
+    return html.replace("href=\"/", f"href=\"{basepath}").replace("src=\"/", f"src=\"{basepath}")
+
+MARKUP_TOKEN = re.compile(r"<!--.*?-->|<![^>]*>|<(/?)([A-Za-z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>", re.S)
+ATTRIBUTE = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?""")
+RAW_TEXT_TAGS = ("pre", "textarea", "script", "style") # copied through untouched, up to their end tag
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"))
+# whitespace next to these never renders, so it can go entirely
+BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style", "article", "aside", "div", "p",
+    "section", "header", "footer", "nav", "main", "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "pre", "table", "thead", "tbody", "tfoot", "tr", "td", "th", "hr", "figure", "figcaption", "form",
+))
+
+def _minify_tag(closing, name, attributes):
+    if closing:
+        return f"</{name}>"
+    parts = [f"<{name}"]
+    self_closing = attributes.rstrip().endswith("/")
+    if self_closing:
+        attributes = attributes.rstrip()[:-1]
+        if name.lower() not in VOID_TAGS:
+            return f"<{name}{collapse_whitespace(attributes).rstrip()} />" # not ours to reinterpret
+    for match in ATTRIBUTE.finditer(attributes):
+        value = match[2]
+        if value is None:
+            parts.append(f" {match[1]}")
+            continue
+        if value[0] in "\"'":
+            value = value[1:-1]
+        parts.append(minified_attribute(match[1], value) if '"' not in value else f" {match[1]}='{value}'")
+    parts.append(">")
+    return "".join(parts)
+
+def minify_markup(html):
+    # Minifies template markup once, when the template is compiled: tags are re-emitted with collapsed
+    # whitespace and unquoted attributes where allowed, whitespace between block-level tags is dropped
+    # and other text runs are collapsed. Page content never goes through here; nodes minify
+    # themselves as they serialize (HTMLNode.emit_minified).
+    out = []
+    position = 0
+    previous_block = True # the start of the document counts as a block boundary
+    pending_text = None
+    def flush_text(next_block):
+        text = collapse_whitespace(pending_text)
+        if previous_block:
+            text = text.lstrip(" ")
+        if next_block:
+            text = text.rstrip(" ")
+        if text:
+            out.append(text)
+
+    while True:
+        match = MARKUP_TOKEN.search(html, position)
+        pending_text = html[position:match.start()] if match else html[position:]
+        name = match[2].lower() if match and match[2] else None
+        is_block = match is None or name is None or name in BLOCK_TAGS
+        flush_text(is_block)
+        if match is None:
+            break
+        if name is None:
+            out.append(match[0]) # comment or doctype
+            position = match.end()
+        elif not match[1] and name in RAW_TEXT_TAGS:
+            end = re.compile(f"</{name}\\s*>", re.I).search(html, match.end())
+            stop = end.end() if end else len(html)
+            out.append(_minify_tag("", match[2], match[3]))
+            out.append(html[match.end():stop])
+            position = stop
+        else:
+            out.append(_minify_tag(match[1], match[2], match[3]))
+            position = match.end()
+        previous_block = is_block
+    return "".join(out)
+
+
+class CompiledTemplate():
+    def __init__(self, source):
+        # parts alternates literal text and slot names: [literal, slot, literal, slot, ..., literal]
+        self.source = source
+        self.parts = []
+        self.slots = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            self.parts.append(source[position:match.start()])
+            self.parts.append(match[1])
+            self.slots.append(match[1])
+            position = match.end()
+        self.parts.append(source[position:])
+        self._rewritten = {}
+
+    def literals(self, basepath="/", assets=None, minify=False):
+        # literal chunks with hashed asset names and the basepath already applied (and minified),
+        # computed once per combination
+        key = (basepath, assets.digest if assets is not None else None, minify)
+        if key not in self._rewritten:
+            parts = self.parts[0::2]
+            if assets is not None:
+                parts = [assets.rewrite_html(part) for part in parts]
+            parts = [rewrite_root_urls(part, basepath) for part in parts]
+            if minify:
+                # minified as one document, so tags next to a slot see their neighbours
+                minified = CompiledTemplate(minify_markup("".join(self._interleave(parts))))
+                if minified.slots == self.slots:
+                    parts = minified.parts[0::2]
+            self._rewritten[key] = parts
+        return self._rewritten[key]
+
+    def _interleave(self, literals):
+        yield literals[0]
+        for slot, literal in zip(self.slots, literals[1:]):
+            yield f"{{{{ {slot} }}}}"
+            yield literal
+
+    def render(self, values, basepath="/", assets=None, minify=False):
+        # only the template's own URLs get the basepath here; links in the values were already
+        # rewritten as their nodes were built (see links.UrlRewriter)
+        literals = self.literals(basepath, assets, minify)
+        pieces = [literals[0]]
+        for i, slot in enumerate(self.slots):
+            if slot in values:
+                pieces.append(values[slot])
+            else:
+                pieces.append(f"{{{{ {slot} }}}}") # unknown slots are left as-is, like str.replace would
+            pieces.append(literals[i + 1])
+        return "".join(pieces)
+
+    def write(self, sink, values, basepath="/", assets=None, minify=False):
+        # streaming counterpart of render(); a slot value may be a string (written as-is) or anything
+        # with emit_html()/emit_minified()
+        write = sink.write
+        literals = self.literals(basepath, assets, minify)
+        sink.write(literals[0])
+        for i, slot in enumerate(self.slots):
+            value = values.get(slot)
+            if value is None:
+                sink.write(f"{{{{ {slot} }}}}")
+            elif isinstance(value, str):
+                write(value)
+            elif minify:
+                value.emit_minified(write)
+            else:
+                value.emit_html(write)
+            sink.write(literals[i + 1])
+
+
+_template_cache = {} # path -> ((mtime_ns, size), CompiledTemplate)
+
+def load_template(template_path):
+    stat = os.stat(template_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(template_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(template_path, "r", encoding="utf-8") as f:
+        template = CompiledTemplate(f.read())
+    _template_cache[template_path] = (stamp, template)
+    return template
+
+def seed_template_cache(template_path, stamp, template):
+    # used as a pool initializer so worker processes reuse the parent's compiled template
+    _template_cache[template_path] = (stamp, template)
+
+def cached_template_entry(template_path):
+    load_template(template_path)
+    return _template_cache[template_path]
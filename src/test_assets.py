@@ -0,0 +1,34 @@
+import unittest
+
+from assets import *
+from links import UrlRewriter
+from template import CompiledTemplate
+
+class TestAssetMap(unittest.TestCase):
+    def setUp(self):
+        self.assets = AssetMap({"/index.css": "/index.0123456789.css", "/images/a.png": "/images/a.abcdef0123.png"})
+
+    def test_hashed_name(self):
+        self.assertEqual(hashed_name("images/tom.png", "66709e9981" + "0" * 54), "images/tom.66709e9981.png")
+        self.assertTrue(should_fingerprint("index.css"))
+        self.assertFalse(should_fingerprint("about/index.html"))
+
+    def test_url(self):
+        self.assertEqual(self.assets.url("/images/a.png"), "/images/a.abcdef0123.png")
+        self.assertEqual(self.assets.url("/images/a.png?v=1#x"), "/images/a.abcdef0123.png?v=1#x")
+        self.assertEqual(self.assets.url("/images/b.png"), "/images/b.png")
+        self.assertEqual(self.assets.url("images/a.png"), "images/a.png") # relative urls are left alone
+
+    def test_template_and_rendered_links(self):
+        template = CompiledTemplate('<link href="/index.css">{{ Content }}')
+        self.assertEqual(template.render({"Content": "x"}, "/site/", self.assets), '<link href="/site/index.0123456789.css">x')
+        rewriter = UrlRewriter("/site/", self.assets)
+        self.assertEqual(rewriter("/images/a.png"), "/site/images/a.abcdef0123.png")
+        self.assertEqual(rewriter.take(), ["/images/a.png"]) # links are checked against the original names
+
+    def test_changed(self):
+        self.assertEqual(self.assets.changed({"/index.css": "/index.0123456789.css", "/old.js": "/old.1111111111.js"}), {"/images/a.png", "/old.js"})
+
+
+if __name__ == "__main__":
+    unittest.main()
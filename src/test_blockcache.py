@@ -0,0 +1,58 @@
+import os, shutil, tempfile, unittest
+
+from blockcache import *
+from utilities import markdown_to_html_node
+
+MARKDOWN = "# Title\n\nShared **disclaimer**\n\n- a\n- b\n\nShared **disclaimer**"
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.db = os.path.join(self.root, "blocks.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_cached_render_matches(self):
+        cache = BlockCache()
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_lru_bound(self):
+        cache = BlockCache(max_bytes=10)
+        cache.put(b"a", ("12345", ()))
+        cache.put(b"b", ("123", ("/x",)))
+        cache.get(b"a") # a is now the most recently used
+        cache.put(b"c", ("12345", ()))
+        self.assertEqual(list(cache.memory), [b"a", b"c"])
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.memory_bytes, 10)
+
+    def test_disk_tier_survives(self):
+        cache = BlockCache(disk_path=self.db)
+        markdown_to_html_node(MARKDOWN, cache)
+        cache.close()
+        cache = BlockCache(disk_path=self.db)
+        markdown_to_html_node(MARKDOWN, cache)
+        self.assertEqual((cache.disk_hits, cache.misses), (3, 0))
+        cache.close()
+
+    def test_fingerprint_change_invalidates(self):
+        cache = BlockCache(disk_path=self.db, fingerprint="v1")
+        markdown_to_html_node(MARKDOWN, cache)
+        cache.close()
+        cache = BlockCache(disk_path=self.db, fingerprint="v2")
+        markdown_to_html_node(MARKDOWN, cache)
+        self.assertEqual((cache.disk_hits, cache.misses), (0, 3))
+        cache.close()
+
+    def test_fingerprint_tracks_options(self):
+        self.assertEqual(renderer_fingerprint(), renderer_fingerprint())
+        self.assertNotEqual(renderer_fingerprint(), renderer_fingerprint("minify"))
+
+
+if __name__ == "__main__":
+    unittest.main()
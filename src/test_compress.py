@@ -0,0 +1,56 @@
+import os, gzip, shutil, tempfile, unittest
+
+from compress import *
+from manifest import BuildManifest, manifest_path
+
+class TestPrecompressor(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.manifest = BuildManifest.load(manifest_path(self.root))
+        self.precompressor = Precompressor(self.root, self.manifest, min_size=100)
+
+    def tearDown(self):
+        self.precompressor.close()
+        shutil.rmtree(self.root)
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_compresses_large_text_outputs(self):
+        page = self.write("index.html", "<p>hello</p>" * 50)
+        small = self.write("small.css", "body {}")
+        image = self.write("a.png", "x" * 500)
+        for path in (page, small, image):
+            self.precompressor.submit(path, "hash-" + path)
+        self.assertEqual(self.precompressor.finish(), (1, 0))
+        with gzip.open(page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 50)
+        self.assertFalse(os.path.exists(small + ".gz"))
+        self.assertFalse(os.path.exists(image + ".gz"))
+
+    def test_unchanged_content_not_recompressed(self):
+        page = self.write("index.html", "<p>hello</p>" * 50)
+        self.precompressor.submit(page, "v1")
+        self.precompressor.finish()
+        self.precompressor.submit(page, "v1")
+        self.assertEqual(self.precompressor.finish(), (0, 1))
+        os.remove(page + ".gz")
+        self.precompressor.submit(page, "v1") # a missing sibling is rewritten
+        self.assertEqual(self.precompressor.finish(), (1, 0))
+
+    def test_removed_outputs_forgotten(self):
+        page = self.write("index.html", "<p>hello</p>" * 50)
+        self.precompressor.submit(page, "v1")
+        self.precompressor.finish()
+        os.remove(page)
+        remove_compressed(page)
+        self.precompressor.finish()
+        self.assertFalse(os.path.exists(page + ".gz"))
+        self.assertEqual(self.manifest.compressed, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import random, unittest
+
+from corpus import *
+from utilities import markdown_to_html_node, extract_title, markdown_to_blocks
+
+class TestCorpus(unittest.TestCase):
+    def test_generated_pages_render(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            markdown = generate_markdown(rng, blocks=15)
+            self.assertTrue(extract_title(markdown))
+            self.assertEqual(len(markdown_to_blocks(markdown)), 16)
+            markdown_to_html_node(markdown).to_html()
+
+    def test_reproducible(self):
+        self.assertEqual(generate_markdown(random.Random(3)), generate_markdown(random.Random(3)))
+
+    def test_parse_mix(self):
+        mix = parse_mix("codeblock=5, paragraph=0")
+        self.assertEqual(mix["codeblock"], 5)
+        self.assertEqual(mix["paragraph"], 0)
+        self.assertEqual(mix["heading"], DEFAULT_MIX["heading"])
+        self.assertRaises(ValueError, parse_mix, "tables=1")
+
+    def test_code_weights_are_independent(self):
+        # fenced blocks and backtick spans have their own weights
+        fenced = generate_markdown(random.Random(2), blocks=30, mix=parse_mix("codeblock=50, inline_code=0"))
+        self.assertIn("```", fenced)
+        self.assertNotIn("`", fenced.replace("```", ""))
+        inline = generate_markdown(random.Random(2), blocks=30, mix=parse_mix("codeblock=0, inline_code=50"))
+        self.assertNotIn("```", inline)
+        self.assertIn("`", inline)
+
+    def test_page_path_depth(self):
+        self.assertEqual(page_path("c", 123, depth=2, fanout=10), os.path.join("c", "section1", "section2", "page123.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
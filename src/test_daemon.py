@@ -0,0 +1,92 @@
+import os, re, sys, time, shutil, tempfile, threading, unittest, subprocess
+from contextlib import redirect_stdout
+from io import StringIO
+
+from daemon import *
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+
+class TestBuildDaemon(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.socket_path = default_socket_path(self.root)
+        self.builds = []
+        handlers = {
+            "build": self.build,
+            "fail": lambda request: 1 / 0,
+        }
+        self.daemon = BuildDaemon(self.socket_path, handlers)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+        while not is_listening(self.socket_path):
+            time.sleep(0.01)
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            send_request(self.socket_path, {"op": "shutdown"})
+        self.thread.join()
+        shutil.rmtree(self.root)
+
+    def serve(self):
+        with redirect_stdout(StringIO()): # the "listening on" line
+            self.daemon.serve()
+
+    def build(self, request):
+        self.builds.append(request.get("paths"))
+        print("building")
+        return {"pages": {"built": 1}}
+
+    def test_requests_share_one_process(self):
+        first = send_request(self.socket_path, {"op": "build"})
+        second = send_request(self.socket_path, {"op": "build", "paths": ["/x.md"]})
+        self.assertTrue(first["ok"])
+        self.assertEqual(first["pages"], {"built": 1})
+        self.assertEqual(first["log"], "building\n") # captured for the client, not printed by the daemon
+        self.assertEqual(self.builds, [None, ["/x.md"]])
+        self.assertEqual(second["ok"], True)
+
+    def test_errors_are_replies(self):
+        self.assertIn("ZeroDivisionError", send_request(self.socket_path, {"op": "fail"})["error"])
+        self.assertIn("unknown op", send_request(self.socket_path, {"op": "nope"})["error"])
+        self.assertTrue(send_request(self.socket_path, {"op": "ping"})["ok"]) # still serving
+
+    def test_refuses_live_socket(self):
+        with self.assertRaises(RuntimeError):
+            BuildDaemon(self.socket_path, {}).serve()
+
+    def test_shutdown_removes_socket(self):
+        send_request(self.socket_path, {"op": "shutdown"})
+        self.thread.join()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+class TestDaemonProcess(unittest.TestCase):
+    # main.py --daemon against the repo's own site, built into a temporary directory
+    def test_path_build_links_fingerprinted_assets(self):
+        root = tempfile.mkdtemp()
+        socket_path = os.path.join(root, "daemon.sock")
+        docs = os.path.join(root, "docs")
+        daemon = subprocess.Popen([sys.executable, os.path.join(SRC, "main.py"), "--daemon", "--fingerprint-assets", "--output", docs, "--socket", socket_path],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            while not is_listening(socket_path):
+                self.assertIsNone(daemon.poll())
+                time.sleep(0.01)
+            source = os.path.join(SRC, os.pardir, "content", "contact", "index.md")
+            self.assertTrue(send_request(socket_path, {"op": "build", "paths": [os.path.abspath(source)]})["ok"])
+            with open(os.path.join(docs, "contact", "index.html")) as f:
+                stylesheet = re.search(r'href="/(index[^"]*\.css)"', f.read())[1]
+            self.assertNotEqual(stylesheet, "index.css")
+            self.assertTrue(os.path.isfile(os.path.join(docs, stylesheet)))
+            page = send_request(socket_path, {"op": "render", "markdown": "# Hi", "page": True})["html"]
+            self.assertIn(f'href="/{stylesheet}"', page)
+            send_request(socket_path, {"op": "shutdown"})
+            daemon.wait(10)
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import os, json, shutil, tempfile, unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fileutilities import *
+from blockcache import BlockCache
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog/post)")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nSome **text**")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, basepath="/", full=False):
+        with redirect_stdout(StringIO()):
+            return generate_pages_incremental(basepath, self.content, self.template, self.dest, full=full)
+
+    def test_second_build_skips_everything(self):
+        self.assertEqual(self.build(), (2, 0, 0))
+        self.assertEqual(self.build(), (0, 2, 0))
+        self.assertTrue(os.path.exists(manifest_path(self.dest)))
+
+    def test_changed_source_rebuilds_one_page(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nSome _other_ text")
+        self.assertEqual(self.build(), (1, 1, 0))
+        with open(os.path.join(self.dest, "blog", "post.html")) as f:
+            self.assertIn("<i>other</i>", f.read())
+
+    def test_template_or_basepath_change_rebuilds_all(self):
+        self.build()
+        self.assertEqual(self.build(basepath="/site/"), (2, 0, 0))
+        self.write(self.template, TEMPLATE + "\n")
+        self.assertEqual(self.build(basepath="/site/"), (2, 0, 0))
+
+    def test_renderer_change_rebuilds_all(self):
+        # pages built by an older serializer are stale even though nothing in the site changed
+        self.build()
+        with mock.patch("fileutilities.renderer_fingerprint", return_value="a newer renderer"):
+            self.assertEqual(self.build(), (2, 0, 0))
+            self.assertEqual(self.build(), (0, 2, 0))
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertEqual(self.build(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_document_index_kept_in_manifest(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ndate: 2024-05-01\n---\n# Post\n\n## Part")
+        self.build()
+        documents = BuildManifest.load(manifest_path(self.dest)).documents()
+        self.assertEqual(documents[os.path.join("blog", "post.html")], {"title": "Post", "headings": [[1, "Post"], [2, "Part"]], "metadata": {"date": "2024-05-01"}})
+        self.assertEqual(documents["index.html"]["title"], "Home")
+
+    def test_full_rebuild_keeps_unchanged_mtimes(self):
+        self.build()
+        index = os.path.join(self.dest, "index.html")
+        os.utime(index, (0, 0))
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nNew text")
+        changes = OutputChanges(self.dest)
+        configure_output_changes(changes)
+        try:
+            self.assertEqual(self.build(full=True), (2, 0, 0))
+        finally:
+            configure_output_changes(None)
+        self.assertEqual(os.stat(index).st_mtime, 0)
+        self.assertEqual(changes.changed, {"blog/post.html"})
+        self.assertEqual(changes.unchanged, {"index.html"})
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.assertEqual(self.build(), (1, 1, 0))
+
+    def test_parallel_output_matches_serial(self):
+        self.build()
+        serial_dest = self.dest
+        self.dest = os.path.join(self.root, "docs-parallel")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursively("/", self.content, self.template, self.dest, jobs=2)
+        for page in ["index.html", os.path.join("blog", "post.html")]:
+            with open(os.path.join(serial_dest, page)) as f1, open(os.path.join(self.dest, page)) as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+    def test_parallel_error_names_page(self):
+        bad = os.path.join(self.content, "blog", "untitled.md")
+        self.write(bad, "no heading here")
+        with redirect_stdout(StringIO()):
+            with self.assertRaises(PageBuildError) as cm:
+                render_pages("/", collect_pages(self.content, self.dest), self.template, jobs=2)
+        self.assertEqual(cm.exception.source_path, bad)
+        self.assertIn("No h1 found", str(cm.exception))
+
+    def test_streamed_page_matches(self):
+        source = os.path.join(self.content, "big.md")
+        self.write(source, "Intro\n\n\n#\nMulti line title\n\n" + "- item\n- **bold** item\n\n```\ncode\n```\n\n" * 50)
+        normal = os.path.join(self.root, "normal.html")
+        streamed = os.path.join(self.root, "streamed.html")
+        cache = BlockCache()
+        with redirect_stdout(StringIO()):
+            normal_hash = generate_page("/", source, self.template, normal)
+            configure_block_cache(cache) # on in every real build, but a streamed page must not fill it
+            configure_streaming(0)
+            try:
+                streamed_hash = generate_page("/", source, self.template, streamed)
+            finally:
+                configure_streaming(STREAM_THRESHOLD)
+                configure_block_cache(None)
+        self.assertEqual(normal_hash, streamed_hash)
+        self.assertEqual((cache.memory_bytes, cache.pending), (0, {}))
+        with open(streamed) as f:
+            self.assertIn("<title>Multi line title</title>", f.read())
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def sync(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            return sync_static(self.static, self.dest, **kwargs)
+
+    def test_only_changed_files_copied(self):
+        self.assertEqual(self.sync(), (2, 0, 0))
+        self.assertEqual(self.sync(), (0, 2, 0))
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.sync(), (1, 1, 0))
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_stale_files_removed_pages_kept(self):
+        self.sync()
+        page = os.path.join(self.dest, "images", "index.html")
+        self.write(page, "<html></html>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.sync(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "a.png")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_verify_hash_skips_touched_files(self):
+        self.sync()
+        source = os.path.join(self.static, "index.css")
+        os.utime(source, ns=(0, 0))
+        dest_mtime = os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns
+        manifest = BuildManifest.load(manifest_path(self.dest))
+        plan = plan_static(self.static, self.dest, manifest, verify_hash=True)
+        self.assertEqual(plan[1], []) # nothing to copy
+        self.assertEqual(plan[4], [(source, os.path.join(self.dest, "index.css"))])
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns, dest_mtime) # planning writes nothing
+        self.assertEqual(self.sync(verify_hash=True), (0, 2, 0))
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns, 0)
+
+    def test_fingerprinted_assets(self):
+        manifest = BuildManifest.load(manifest_path(self.dest))
+        self.assertEqual(self.sync(manifest=manifest, fingerprint=True), (2, 0, 0))
+        hashed_css = manifest.static["index.css"]["dest"]
+        self.assertRegex(hashed_css, r"^index\.[0-9a-f]{10}\.css$")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+        with open(os.path.join(self.dest, ASSET_MANIFEST)) as f:
+            self.assertEqual(json.load(f)["index.css"], hashed_css)
+        self.assertEqual(self.sync(manifest=manifest, fingerprint=True), (0, 2, 0))
+
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.sync(manifest=manifest, fingerprint=True), (1, 1, 1))
+        self.assertNotEqual(manifest.static["index.css"]["dest"], hashed_css)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, hashed_css)))
+
+        self.assertEqual(self.sync(manifest=manifest), (2, 0, 2)) # back to plain names
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, ASSET_MANIFEST)))
+
+    def test_fingerprint_reuses_recorded_hashes(self):
+        manifest = BuildManifest.load(manifest_path(self.dest))
+        self.sync(manifest=manifest, fingerprint=True)
+        recorded = manifest.static["index.css"]["hash"]
+        manifest.static["index.css"]["hash"] = "0" * 64 # a stale hash proves it was not recomputed
+        self.sync(manifest=manifest, fingerprint=True)
+        self.assertEqual(manifest.static["index.css"]["hash"], "0" * 64)
+        self.assertNotEqual(recorded, "0" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from io import StringIO
 
 from htmlnode import *
 
@@ -79,6 +80,46 @@ class TestParentNode(unittest.TestCase):
             "<p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p>"
         )
 
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "Some "), LeafNode("b", "bold")]),
+            LeafNode("a", "link", {"href": "/x", "target": "_blank"}),
+        ])
+        sink = StringIO()
+        node.write_html(sink)
+        self.assertEqual(sink.getvalue(), node.to_html())
+        self.assertEqual(sink.getvalue(), '<div><p>Some <b>bold</b></p><a href="/x" target="_blank">link</a></div>')
+
+    def test_to_minified_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "Some\n   text "), LeafNode("b", "bold  text")]),
+            LeafNode("a", "link", {"href": "/x?a=b", "target": "_blank", "title": "two words"}),
+            ParentNode("pre", [LeafNode("code", "  keep\n    this")]),
+            LeafNode("code", "a  b"),
+            RawHTMLNode("<p>already   final</p>"),
+        ])
+        self.assertEqual(
+            node.to_minified_html(),
+            '<div><p>Some text <b>bold text</b></p><a href="/x?a=b" target=_blank title="two words">link</a>'
+            '<pre><code>  keep\n    this</code></pre><code>a  b</code><p>already   final</p></div>'
+        )
+
+    def test_escaping(self):
+        self.assertIs(escape_text("clean text"), "clean text") # fast path hands back the same string
+        self.assertEqual(escape_text('a < b && "c" > d'), 'a &lt; b &amp;&amp; "c" &gt; d')
+        self.assertEqual(escape_attribute('/q?a=1&b="2"'), "/q?a=1&amp;b=&quot;2&quot;")
+        node = ParentNode("p", [
+            LeafNode(None, "1 < 2 & 3 > 2"),
+            LeafNode("a", "<Back", {"href": '/x?a=1&b="2"'}),
+            ParentNode("code", [LeafNode(None, "if a<b:\n    print('&')")]),
+            RawHTMLNode("<b>&amp;</b>"),
+        ])
+        expected = ('<p>1 &lt; 2 &amp; 3 &gt; 2<a href="/x?a=1&amp;b=&quot;2&quot;">&lt;Back</a>'
+                    "<code>if a&lt;b:\n    print('&amp;')</code><b>&amp;</b></p>")
+        self.assertEqual(node.to_html(), expected)
+        self.assertEqual(node.to_minified_html(), expected)
+        self.assertEqual(LeafNode("a", "x", {"href": "/a&b"}).to_minified_html(), "<a href=/a&amp;b>x</a>")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os, struct, shutil, tempfile, unittest
+
+from imagesize import *
+from manifest import BuildManifest, manifest_path
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+def jpeg(width, height, exif_size=0):
+    data = b"\xff\xd8"
+    data += b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    if exif_size:
+        data += b"\xff\xe1" + struct.pack(">H", exif_size + 2) + b"\x00" * exif_size
+    data += b"\xff\xc4" + struct.pack(">H", 4) + b"\x00\x00" # a DHT table, not a frame
+    data += b"\xff\xc2" + struct.pack(">HBHH", 17, 8, height, width) + b"\x00" * 10
+    return data + b"\xff\xd9"
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def size_of(self, data, name="image"):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return image_size(path)
+
+    def test_formats(self):
+        self.assertEqual(self.size_of(png(928, 468)), (928, 468))
+        self.assertEqual(self.size_of(b"GIF89a" + struct.pack("<HH", 320, 200) + b"\x00" * 20), (320, 200))
+        self.assertEqual(self.size_of(jpeg(1024, 768)), (1024, 768))
+        self.assertEqual(self.size_of(jpeg(640, 480, exif_size=60000)), (640, 480))
+        vp8x = b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8 + (1999).to_bytes(3, "little") + (999).to_bytes(3, "little")
+        self.assertEqual(self.size_of(vp8x), (2000, 1000))
+        vp8l = b"RIFF\x00\x00\x00\x00WEBPVP8L" + b"\x00" * 4 + b"\x2f" + ((99) | (49 << 14)).to_bytes(4, "little")
+        self.assertEqual(self.size_of(vp8l), (100, 50))
+
+    def test_unknown_and_truncated(self):
+        self.assertIsNone(self.size_of(b"plain text"))
+        self.assertIsNone(self.size_of(png(10, 10)[:20]))
+        self.assertIsNone(self.size_of(jpeg(10, 10)[:30]))
+
+    def test_sizes_cached_by_hash(self):
+        static = os.path.join(self.root, "static")
+        os.makedirs(os.path.join(static, "images"))
+        with open(os.path.join(static, "images", "a.png"), "wb") as f:
+            f.write(png(40, 30))
+        manifest = BuildManifest.load(manifest_path(os.path.join(self.root, "docs")))
+        manifest.static = {os.path.join("images", "a.png"): {"mtime": 0, "size": 0, "hash": None}}
+        images = ImageAttributes.from_static(static, manifest, lazy=True)
+        self.assertEqual(images.props("/images/a.png?v=2"), {"width": "40", "height": "30", "loading": "lazy", "decoding": "async"})
+        self.assertEqual(images.props("https://x.y/b.png"), {"loading": "lazy", "decoding": "async"})
+        content_hash = manifest.static[os.path.join("images", "a.png")]["hash"]
+        manifest.image_sizes[content_hash] = [1, 2] # served from the cache, the file isn't read again
+        self.assertEqual(ImageAttributes.from_static(static, manifest).sizes, {"/images/a.png": [1, 2]})
+
+    def test_changed(self):
+        images = ImageAttributes({"/a.png": [1, 2], "/b.png": [3, 4]})
+        self.assertEqual(images.changed({"sizes": {"/a.png": [1, 2], "/b.png": [3, 5], "/c.png": [1, 1]}}), {"/b.png", "/c.png"})
+
+
+if __name__ == "__main__":
+    unittest.main()
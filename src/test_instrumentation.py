@@ -0,0 +1,84 @@
+import os, shutil, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fileutilities import *
+from instrumentation import *
+from blockcache import BlockCache
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "index.md")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.source, "w") as f:
+            f.write("# Title\n\nSome **bold** [link](/x)\n\n- a\n- b")
+        with open(self.template, "w") as f:
+            f.write('<link href="/a.css"><title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_same_output_as_generate_page(self):
+        plain = os.path.join(self.root, "plain.html")
+        timed = os.path.join(self.root, "timed.html")
+        with redirect_stdout(StringIO()):
+            plain_hash = generate_page("/site/", self.source, self.template, plain)
+            timed_hash, record = generate_page_timed("/site/", self.source, self.template, timed)
+        with open(plain) as f1, open(timed) as f2:
+            self.assertEqual(f1.read(), f2.read())
+        self.assertEqual(plain_hash, timed_hash)
+        self.assertEqual(record["bytes_out"], os.path.getsize(timed))
+        self.assertEqual(set(record["stages"]), set(STAGES) - {"static_copy"})
+
+    def test_times_the_real_pipeline(self):
+        # the timed page goes through the block cache, and the streaming parser, like any other
+        cache = BlockCache()
+        configure_block_cache(cache)
+        try:
+            with redirect_stdout(StringIO()):
+                plain_hash = generate_page("/", self.source, self.template, os.path.join(self.root, "plain.html"))
+                timed_hash, record = generate_page_timed("/", self.source, self.template, os.path.join(self.root, "timed.html"))
+                configure_streaming(0)
+                streamed_hash, record = generate_page_timed("/", self.source, self.template, os.path.join(self.root, "streamed.html"))
+        finally:
+            configure_block_cache(None)
+            configure_streaming(STREAM_THRESHOLD)
+        self.assertEqual(plain_hash, timed_hash)
+        self.assertEqual(plain_hash, streamed_hash)
+        self.assertGreater(cache.hits, 0)
+        self.assertIn("block_split", record["stages"])
+        self.assertIsNone(stage_timer())
+
+    def test_minify_report(self):
+        report = BuildReport(self.root)
+        configure_minify(True)
+        try:
+            with redirect_stdout(StringIO()):
+                render_pages("/", [(self.source, os.path.join(self.root, "out.html"))], self.template, report=report)
+                direct_hash = generate_page("/", self.source, self.template, os.path.join(self.root, "direct.html"))
+        finally:
+            configure_minify(False)
+        report.finish()
+        self.assertEqual(report.to_dict()["minify"]["pages"], 1)
+        self.assertGreater(report.pages[0]["minify_bytes_saved"], 0)
+        with open(os.path.join(self.root, "out.html")) as f:
+            self.assertEqual(hash_bytes(f.read()), direct_hash) # same minified output either way
+        self.assertIn("ssg_minify_bytes_saved", report.to_openmetrics())
+
+    def test_report_outputs(self):
+        report = BuildReport(self.root)
+        with redirect_stdout(StringIO()):
+            render_pages("/", [(self.source, os.path.join(self.root, "out.html"))], self.template, report=report)
+        report.finish()
+        summary = report.to_dict()
+        self.assertEqual(summary["pages_built"], 1)
+        self.assertEqual(summary["slowest_pages"][0]["page"], "index.md")
+        metrics = report.to_openmetrics()
+        self.assertIn('ssg_stage_seconds{stage="inline_parse"}', metrics)
+        self.assertIn('ssg_slowest_page_seconds{page="index.md"}', metrics)
+        self.assertTrue(metrics.endswith("# EOF\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os, sys, shutil, tempfile, unittest, subprocess
+
+from inventory import *
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+class TestSiteInventory(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for rel_path in ("index.md", "blog/b.md", "blog/a.md", "blog/img/cat.png", "style.css"):
+            path = os.path.join(self.root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(rel_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_scan(self):
+        inventory = SiteInventory.scan(self.root)
+        self.assertEqual(list(inventory.files), ["blog/a.md", "blog/b.md", "blog/img/cat.png", "index.md", "style.css"])
+        self.assertEqual(inventory.dirs, ["blog", "blog/img"])
+        site_file = inventory.files["blog/img/cat.png"]
+        self.assertEqual(site_file.path, os.path.join(self.root, "blog", "img", "cat.png"))
+        self.assertEqual(site_file.stat.st_size, os.path.getsize(site_file.path))
+        self.assertIn("style.css", inventory)
+        self.assertEqual(len(inventory), 5)
+        self.assertIsNone(SiteInventory.scan(self.root, stat=False).files["index.md"].stat)
+
+    def test_missing_root(self):
+        inventory = SiteInventory.scan(os.path.join(self.root, "missing"))
+        self.assertEqual((len(inventory), inventory.dirs), (0, []))
+
+    def test_pages(self):
+        inventory = SiteInventory.scan(self.root)
+        self.assertEqual(inventory.pages("docs"), [
+            (inventory.files["blog/a.md"], os.path.join("docs", "blog", "a.html")),
+            (inventory.files["blog/b.md"], os.path.join("docs", "blog", "b.html")),
+            (inventory.files["index.md"], os.path.join("docs", "index.html")),
+        ])
+
+
+class TestDryRun(unittest.TestCase):
+    # --dry-run prints the plan and leaves the output directory alone
+    def test_dry_run_writes_nothing(self):
+        root = tempfile.mkdtemp()
+        try:
+            output = os.path.join(root, "docs")
+            result = subprocess.run([sys.executable, MAIN, "/site/", "--dry-run", "--output", output], check=True, capture_output=True, text=True)
+            self.assertIn("render  content/index.md", result.stdout)
+            self.assertIn("Pages: ", result.stdout)
+            self.assertFalse(os.path.exists(output))
+            subprocess.run([sys.executable, MAIN, "/site/", "--output", output], check=True, stdout=subprocess.DEVNULL)
+            result = subprocess.run([sys.executable, MAIN, "/site/", "--dry-run", "--output", output], check=True, capture_output=True, text=True)
+            self.assertNotIn("render  ", result.stdout)
+            self.assertNotIn("copy    ", result.stdout)
+            self.assertIn(" to render, ", result.stdout)
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os, shutil, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from links import *
+from utilities import configure_url_rewriter, markdown_to_html_node
+from blockcache import BlockCache
+from fileutilities import generate_pages_incremental
+from manifest import BuildManifest, manifest_path
+
+class TestUrlRewriter(unittest.TestCase):
+    def tearDown(self):
+        configure_url_rewriter(None)
+
+    def test_is_internal(self):
+        self.assertTrue(is_internal("/blog/tom"))
+        self.assertTrue(is_internal("../images/a.png"))
+        self.assertFalse(is_internal("https://www.boot.dev"))
+        self.assertFalse(is_internal("mailto:a@b.c"))
+        self.assertFalse(is_internal("//cdn.example.com/x.js"))
+        self.assertFalse(is_internal("#top"))
+
+    def test_rewrites_only_node_urls(self):
+        rewriter = UrlRewriter("/site/")
+        configure_url_rewriter(rewriter)
+        markdown = 'See [tom](/blog/tom) and ![pic](/a.png) or [boot](https://boot.dev)\n\n```\nhref="/raw"\n```'
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertIn('<a href="/site/blog/tom">tom</a>', html)
+        self.assertIn('<img src="/site/a.png" alt="pic"></img>', html)
+        self.assertIn('<a href="https://boot.dev">boot</a>', html)
+        self.assertIn('href="/raw"', html) # code is content, not a link
+        self.assertEqual(rewriter.take(), ["/blog/tom", "/a.png"])
+
+    def test_cached_blocks_still_report_links(self):
+        rewriter = UrlRewriter("/site/")
+        configure_url_rewriter(rewriter)
+        cache = BlockCache()
+        first = markdown_to_html_node("[tom](/blog/tom)", cache).to_html()
+        self.assertEqual(rewriter.take(), ["/blog/tom"])
+        second = markdown_to_html_node("[tom](/blog/tom)", cache).to_html()
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(rewriter.take(), ["/blog/tom"])
+
+    def test_cache_is_basepath_specific(self):
+        cache = BlockCache()
+        configure_url_rewriter(UrlRewriter("/a/"))
+        self.assertIn("/a/x", markdown_to_html_node("[x](/x)", cache).to_html())
+        configure_url_rewriter(UrlRewriter("/b/"))
+        self.assertIn("/b/x", markdown_to_html_node("[x](/x)", cache).to_html())
+
+
+class TestLinkIndex(unittest.TestCase):
+    def test_resolve_and_broken_links(self):
+        index = LinkIndex()
+        for path in ["index.html", "blog/tom/index.html", "images/a.png"]:
+            index.add_output(path)
+        page_links = {
+            "blog/tom/index.html": ["/", "/blog/tom", "/blog/tom/", "../../images/a.png", "/images/b.png", "?q=1"],
+            "index.html": ["blog/tom/index.html#top", "/missing"],
+        }
+        self.assertEqual(index.broken_links(page_links), [("blog/tom/index.html", "/images/b.png"), ("index.html", "/missing")])
+
+    def test_site_wide_check_covers_unchanged_pages(self):
+        root = tempfile.mkdtemp()
+        try:
+            content = os.path.join(root, "content")
+            dest = os.path.join(root, "docs")
+            os.makedirs(os.path.join(content, "blog", "post"))
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\n[post](/blog/post) [gone](/blog/gone)")
+            with open(os.path.join(content, "blog", "post", "index.md"), "w") as f:
+                f.write("# Post\n\n[home](/)")
+            with redirect_stdout(StringIO()):
+                generate_pages_incremental("/", content, template, dest)
+                os.remove(os.path.join(content, "blog", "post", "index.md"))
+                generate_pages_incremental("/", content, template, dest)
+            manifest = BuildManifest.load(manifest_path(dest))
+            # index.md wasn't rebuilt, but its links were kept in the manifest
+            self.assertEqual(check_manifest_links(manifest), [("index.html", "/blog/gone"), ("index.html", "/blog/post")])
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
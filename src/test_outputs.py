@@ -0,0 +1,76 @@
+import os, sys, json, shutil, filecmp, tempfile, unittest, subprocess
+
+from outputs import *
+from manifest import hash_bytes
+
+class TestWriteOutput(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "index.html")
+        self.changes = OutputChanges(self.root)
+        configure_output_changes(self.changes)
+
+    def tearDown(self):
+        configure_output_changes(None)
+        shutil.rmtree(self.root)
+
+    def test_identical_output_is_not_rewritten(self):
+        self.assertEqual(write_text_output(self.path, "<p>one</p>"), hash_bytes("<p>one</p>"))
+        self.assertTrue(last_write_changed())
+        os.utime(self.path, (0, 0))
+        write_text_output(self.path, "<p>one</p>")
+        self.assertFalse(last_write_changed())
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+        write_text_output(self.path, "<p>two</p>")
+        self.assertTrue(last_write_changed())
+        self.assertNotEqual(os.stat(self.path).st_mtime, 0)
+        self.assertEqual(os.listdir(self.root), ["index.html"]) # no temp files left behind
+
+    def test_failed_write_keeps_old_file(self):
+        write_text_output(self.path, "<p>one</p>")
+        def emit(writer):
+            writer.write("<p>half")
+            raise RuntimeError("render failed")
+        with self.assertRaises(RuntimeError):
+            write_output(self.path, emit)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>one</p>")
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+    def test_changes(self):
+        os.makedirs(os.path.join(self.root, "blog"))
+        post = os.path.join(self.root, "blog", "post.html")
+        write_text_output(self.path, "a")
+        write_text_output(post, "b")
+        self.changes = OutputChanges(self.root) # a second build
+        configure_output_changes(self.changes)
+        write_text_output(self.path, "a")
+        remove_output(post)
+        record_output(os.path.join(self.root, "index.css"), True)
+        self.assertEqual(self.changes.summary(), "1 changed, 1 unchanged, 1 deleted")
+        changes_path = self.changes.write(os.path.join(self.root, "changes.json"))
+        with open(changes_path) as f:
+            self.assertEqual(json.load(f), {"changed": ["index.css"], "unchanged": 1, "deleted": ["blog/post.html"]})
+
+
+class TestLocale(unittest.TestCase):
+    # sources and outputs are UTF-8 whatever the locale says; the site's contact page has "Váya márië"
+    def test_ascii_locale_build(self):
+        main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        ascii_env = dict(os.environ, LC_ALL="C", PYTHONCOERCECLOCALE="0", PYTHONUTF8="0")
+        root = tempfile.mkdtemp()
+        try:
+            for name, env in (("utf8", None), ("ascii", ascii_env)):
+                subprocess.run([sys.executable, main, "--output", os.path.join(root, name)], env=env, check=True, stdout=subprocess.DEVNULL)
+            page = os.path.join("contact", "index.html")
+            self.assertTrue(filecmp.cmp(os.path.join(root, "utf8", page), os.path.join(root, "ascii", page), shallow=False))
+            changes = os.path.join(root, "changes.json")
+            subprocess.run([sys.executable, main, "--full", "--output", os.path.join(root, "ascii"), "--changes", changes], env=ascii_env, check=True, stdout=subprocess.DEVNULL)
+            with open(changes) as f:
+                self.assertEqual(json.load(f)["changed"], []) # identical pages are recognised as such
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
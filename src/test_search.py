@@ -0,0 +1,66 @@
+import os, json, shutil, tempfile, unittest
+
+from search import *
+from manifest import BuildManifest, manifest_path
+
+class TestTerms(unittest.TestCase):
+    def test_count_terms(self):
+        counts = count_terms(["The [Tolkien](/tolkien) page, and Tolkien's books", "![cover](/images/book.png) 42"])
+        self.assertEqual(counts, {"tolkien": 2, "page": 1, "books": 1, "cover": 1, "42": 1}) # link targets and stopwords are skipped
+
+    def test_postings_round_trip(self):
+        postings = {7: 2, 3: 1, 12: 5}
+        self.assertEqual(encode_postings(postings), [3, 1, 4, 2, 5, 5])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_shard_key_and_url(self):
+        self.assertEqual(shard_key("tolkien"), "to")
+        self.assertEqual(shard_key("élan"), "_l")
+        self.assertEqual(page_url(os.path.join("blog", "tom", "index.html")), "/blog/tom")
+        self.assertEqual(page_url("index.html"), "/")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.manifest = BuildManifest.load(manifest_path(self.root))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read(self, name):
+        with open(os.path.join(self.root, SEARCH_DIR, name)) as f:
+            return json.load(f)
+
+    def test_update_and_remove(self):
+        index = SearchIndex(self.root, self.manifest)
+        self.assertFalse(index.is_complete(["index.md"]))
+        index.update({
+            "index.md": ("index.html", "Home", {"tolkien": 2, "home": 5}),
+            "blog/tom.md": (os.path.join("blog", "tom", "index.html"), "Tom", {"tolkien": 1, "tom": 6}),
+        }, [])
+        self.assertTrue(index.is_complete(["index.md", "blog/tom.md"]))
+        self.assertEqual(self.read("pages.json"), {"0": ["/", "Home"], "1": ["/blog/tom", "Tom"]})
+        self.assertEqual(self.read("to.json"), {"tolkien": [0, 2, 1, 1], "tom": [1, 6]})
+        self.assertTrue(os.path.exists(os.path.join(self.root, SEARCH_DIR, "search.js")))
+
+        index.update({}, ["blog/tom.md"])
+        self.assertEqual(self.read("pages.json"), {"0": ["/", "Home"]})
+        self.assertEqual(self.read("to.json"), {"tolkien": [0, 2]})
+
+    def test_only_touched_shards_are_rewritten(self):
+        index = SearchIndex(self.root, self.manifest)
+        index.update({"a.md": ("a.html", "A", {"apple": 1}), "b.md": ("b.html", "B", {"banana": 1})}, [])
+        banana = os.path.join(self.root, SEARCH_DIR, "ba.json")
+        os.utime(banana, (0, 0))
+        self.assertEqual(index.update({"a.md": ("a.html", "A", {"apricot": 1})}, []), 1)
+        self.assertEqual(os.stat(banana).st_mtime, 0)
+        self.assertEqual(self.read("ap.json"), {"apricot": [0, 1]})
+
+        SearchIndex.drop(self.root, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.root, SEARCH_DIR)))
+        self.assertEqual(self.manifest.search, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
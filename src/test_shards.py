@@ -0,0 +1,112 @@
+import os, sys, shutil, filecmp, tempfile, unittest, subprocess
+from contextlib import redirect_stdout, redirect_stderr
+from io import StringIO
+
+from fileutilities import *
+from shards import *
+from main import parse_args
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+class TestAssignShards(unittest.TestCase):
+    def test_balanced_and_deterministic(self):
+        sizes = {"a.md": 900, "b.md": 500, "c.md": 400, "d.md": 300, "e.md": 100}
+        assignment = assign_shards(sizes, 2)
+        self.assertEqual(assignment, {"a.md": 1, "b.md": 2, "c.md": 2, "d.md": 1, "e.md": 2})
+        self.assertEqual(assign_shards(dict(reversed(sizes.items())), 2), assignment) # input order doesn't matter
+        self.assertEqual(set(assign_shards(sizes, 8).values()), {1, 2, 3, 4, 5})
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "1", "a/b"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+
+
+class TestMergeShards(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for name, text in (("index.md", "# Home\n\n" + "text " * 50), ("blog/a.md", "# A"), ("blog/b.md", "# B\n\nmore")):
+            self.write(os.path.join(self.content, name), text)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, shard):
+        shard_dir = os.path.join(self.root, f"shard{shard[0]}")
+        with redirect_stdout(StringIO()):
+            generate_pages_incremental("/", self.content, self.template, shard_dir, shard=shard)
+        self.write(os.path.join(shard_dir, "shared.css"), "body {}") # what sync_static gives every shard
+        return shard_dir
+
+    def merge(self, shard_dirs):
+        with redirect_stdout(StringIO()):
+            return merge_shards(shard_dirs, os.path.join(self.root, "docs"), self.content)
+
+    def test_merge(self):
+        shard_dirs = [self.build((1, 2)), self.build((2, 2))]
+        self.assertEqual(self.merge(shard_dirs), (4, 0, 0))
+        docs = os.path.join(self.root, "docs")
+        self.assertEqual(sorted(BuildManifest.load(manifest_path(docs)).pages), ["blog/a.md", "blog/b.md", "index.md"])
+        self.assertEqual(self.merge(shard_dirs), (0, 4, 0))
+
+    def test_missing_and_colliding(self):
+        shard_dirs = [self.build((1, 2)), self.build((2, 2))]
+        with self.assertRaises(ShardMergeError) as cm:
+            self.merge(shard_dirs[:1])
+        self.assertEqual(len(cm.exception.problems), 2) # the pages of shard 2
+        self.write(os.path.join(shard_dirs[1], "shared.css"), "body { color: red }")
+        with self.assertRaises(ShardMergeError) as cm:
+            self.merge(shard_dirs)
+        self.assertIn("shared.css", cm.exception.problems[0])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "docs"))) # nothing copied
+
+    def test_reshard_output(self):
+        # a shard built into a dir holding every page removes the others', without calling them deleted
+        shard_dir = os.path.join(self.root, "out")
+        with redirect_stdout(StringIO()):
+            generate_pages_incremental("/", self.content, self.template, shard_dir)
+        log = StringIO()
+        with redirect_stdout(log):
+            generate_pages_incremental("/", self.content, self.template, shard_dir, shard=(1, 2))
+        self.assertIn("belongs to another shard", log.getvalue())
+        self.assertNotIn("was deleted", log.getvalue())
+
+    def test_shard_needs_output(self):
+        with redirect_stderr(StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--shard", "1/3"])
+        self.assertEqual(parse_args(["--shard", "1/3", "--output", "out"]).shard, (1, 3))
+
+
+def tree_files(root):
+    return sorted(os.path.relpath(os.path.join(dirpath, name), root) for dirpath, _, names in os.walk(root) for name in names)
+
+class TestShardProcesses(unittest.TestCase):
+    # the CI flow end to end: shards as separate processes, merged, compared with a one-node build
+    def test_sharded_build_matches_single_build(self):
+        root = tempfile.mkdtemp()
+        try:
+            shards = [subprocess.Popen([sys.executable, MAIN, "/site/", "--shard", f"{i}/3", "--output", os.path.join(root, f"shard{i}")],
+                                       stdout=subprocess.DEVNULL) for i in (1, 2, 3)]
+            self.assertEqual([shard.wait() for shard in shards], [0, 0, 0])
+            merge = [sys.executable, MAIN, "--merge"] + [os.path.join(root, f"shard{i}") for i in (1, 2, 3)] + ["--output", os.path.join(root, "docs")]
+            subprocess.run(merge, check=True, stdout=subprocess.DEVNULL)
+            subprocess.run([sys.executable, MAIN, "/site/", "--output", os.path.join(root, "single")], check=True, stdout=subprocess.DEVNULL)
+            merged, single = tree_files(os.path.join(root, "docs")), tree_files(os.path.join(root, "single"))
+            self.assertEqual(merged, single)
+            for rel_path in merged:
+                self.assertTrue(filecmp.cmp(os.path.join(root, "docs", rel_path), os.path.join(root, "single", rel_path), shallow=False), rel_path)
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os, tempfile, unittest
+
+from template import *
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_render_slots(self):
+        template = CompiledTemplate("<title>{{ Title }}</title><div>{{ Content }}</div>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        html = template.render({"Title": "Hi", "Content": "<p>body</p>"})
+        self.assertEqual(html, "<title>Hi</title><div><p>body</p></div>")
+
+    def test_repeated_and_unknown_slots(self):
+        template = CompiledTemplate("{{ Title }}|{{ Title }}|{{ Author }}")
+        self.assertEqual(template.render({"Title": "T"}), "T|T|{{ Author }}")
+        self.assertEqual(template.render({"Title": "T", "Author": "A"}), "T|T|A")
+
+    def test_basepath_rewrite(self):
+        # the template's own URLs are rewritten; slot values are left alone (their links are rewritten at render time)
+        template = CompiledTemplate('<link href="/index.css">{{ Content }}')
+        html = template.render({"Content": '<img src="/a.png"><a href="https://x.y/">x</a>'}, "/site/")
+        expected = '<link href="/site/index.css"><img src="/a.png"><a href="https://x.y/">x</a>'
+        self.assertEqual(html, expected)
+
+    def test_minified_literals(self):
+        template = CompiledTemplate('<!doctype html>\n<html>\n  <head>\n    <meta charset="utf-8" />\n    <title>{{ Title }}</title>\n'
+                                    '    <link href="/index.css" rel="stylesheet" />\n  </head>\n  <body>\n    <article>{{ Content }}</article>\n'
+                                    '    <pre>\n  as is\n</pre>\n    <p><a href="/a">a</a> <b>b</b></p>\n  </body>\n</html>\n')
+        html = template.render({"Title": "T", "Content": "C"}, "/site/", minify=True)
+        expected = ('<!doctype html><html><head><meta charset=utf-8><title>T</title><link href=/site/index.css rel=stylesheet></head>'
+                    '<body><article>C</article><pre>\n  as is\n</pre><p><a href=/site/a>a</a> <b>b</b></p></body></html>')
+        self.assertEqual(html, expected)
+        self.assertIn("\n    <article>", template.render({"Title": "T", "Content": "C"}, "/site/")) # the plain form is kept too
+
+    def test_minify_markup_quoting(self):
+        self.assertEqual(minify_markup('<input   disabled value="" data-x=\'say "hi"\'>'), '<input disabled value="" data-x=\'say "hi"\'>')
+        self.assertEqual(minify_markup('<a href="{{ Url }}">x</a>'), '<a href="{{ Url }}">x</a>')
+
+    def test_load_template_reloads_on_change(self):
+        fd, path = tempfile.mkstemp(suffix=".html")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write("a {{ Content }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            with open(path, "w") as f:
+                f.write("bb {{ Content }}")
+            second = load_template(path)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.render({"Content": "x"}), "bb x")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
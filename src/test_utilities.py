@@ -237,6 +237,27 @@ class TestTexttoTextNodes(unittest.TestCase):
         ]
         self.assertEqual(text_to_textnodes(text), expected)
 
+    def test_repeated_segments(self):
+        text = "_a_a and **b** b **b**"
+        expected = [
+            TextNode("a", TextType.ITALIC),
+            TextNode("a and ", TextType.TEXT),
+            TextNode("b", TextType.BOLD),
+            TextNode(" b ", TextType.TEXT),
+            TextNode("b", TextType.BOLD)
+        ]
+        self.assertEqual(text_to_textnodes(text), expected)
+
+    def test_delimiter_precedence(self):
+        text = "**`not code`** and _[x](/y) **not bold**_"
+        expected = [
+            TextNode("`not code`", TextType.BOLD),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("x", TextType.LINK, "/y"),
+            TextNode(" **not bold**", TextType.ITALIC)
+        ]
+        self.assertEqual(text_to_textnodes(text), expected)
+
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
         md = """
@@ -304,6 +325,24 @@ class TestBlockToBlockType(unittest.TestCase):
         self.assertEqual(block_to_block_type(block3), expected)
         self.assertEqual(block_to_block_type(block4), expected)
 
+class TestBlockScanner(unittest.TestCase):
+    def test_same_blocks_as_markdown_to_blocks(self):
+        markdown = "\n\n  # Title  \n\n\n\nline one\n  \nline two\n\n\n- a\n- b\n \n\n"
+        blocks = ["\n".join(lines) for lines in markdown_to_block_lines(markdown)]
+        self.assertEqual(blocks, markdown_to_blocks(markdown))
+
+    def test_classify(self):
+        self.assertEqual(classify_block_lines(["### Head"]), (BlockType.HEADING, "h3", "Head"))
+        self.assertEqual(classify_block_lines(["```", "x", "```"]), (BlockType.CODE, "code", "\nx\n"))
+        self.assertEqual(classify_block_lines(["> a", "> b"]), (BlockType.QUOTE, "blockquote", "a\nb"))
+        self.assertEqual(classify_block_lines(["- a", "- b"]), (BlockType.UNORDERED_LIST, "ul", ["a", "b"]))
+        self.assertEqual(classify_block_lines(["1. a", "2. b"]), (BlockType.ORDERED_LIST, "ol", ["a", "b"]))
+        self.assertEqual(classify_block_lines(["- a", "b"]), (BlockType.PARAGRAPH, "p", "- a\nb"))
+
+    def test_duplicate_ordered_lines(self):
+        self.assertEqual(block_to_block_type("1. a\n1. a"), BlockType.PARAGRAPH)
+        self.assertEqual(classify_block_lines(["1. a", "1. a"])[0], BlockType.PARAGRAPH)
+
 class TestMarkdownToHTMLNode(unittest.TestCase):
     def test_markdown_to_html_node(self):
         markdown = "### this is a heading\n\n```and\nsome\ncode```"
@@ -407,3 +446,24 @@ class TestExtractTitle(unittest.TestCase):
             extract_title,
             markdown
         )
+
+class TestParsedDocument(unittest.TestCase):
+    def test_one_pass(self):
+        markdown = "---\ndate: 2024-05-01\nauthor: Tom\n---\n\n# Title\n\n## Part *one*\n\ntext\n\n### Deeper"
+        document = parse_document(markdown)
+        self.assertEqual(document.title, "Title")
+        self.assertEqual(document.headings, [[1, "Title"], [2, "Part *one*"], [3, "Deeper"]])
+        self.assertEqual(document.metadata, {"date": "2024-05-01", "author": "Tom"})
+        self.assertEqual(document.body.to_html(), markdown_to_html_node(markdown.split("---\n\n", 1)[1]).to_html())
+        self.assertEqual(scan_document(markdown.split("\n")).summary(), document.summary())
+
+    def test_not_front_matter(self):
+        markdown = "---\njust a paragraph\n---\n\n# Title"
+        document = parse_document(markdown)
+        self.assertEqual(document.metadata, {})
+        self.assertEqual(document.body.to_html(), markdown_to_html_node(markdown).to_html())
+
+    def test_title(self):
+        self.assertEqual(parse_document("---\ntitle: From meta\n---\ntext").require_title(), "From meta")
+        self.assertRaises(ValueError, parse_document("## Only h2").require_title)
+
@@ -0,0 +1,113 @@
+import os, struct, shutil, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from watch import *
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(self.content)
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "about.md"), "# About")
+        with redirect_stdout(StringIO()):
+            generate_pages_incremental("/", self.content, self.template, self.dest)
+        self.watcher = SiteWatcher("/", self.content, self.static, self.template, self.dest)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def poll_and_rebuild(self):
+        with redirect_stdout(StringIO()):
+            changed, deleted = self.watcher.poll(quiet=0)
+            return self.watcher.rebuild(changed, deleted)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(quiet=0), ([], []))
+
+    def test_changed_page_rebuilt(self):
+        self.write(os.path.join(self.content, "index.md"), "# New home")
+        self.assertEqual(self.poll_and_rebuild(), 1)
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertEqual(f.read(), "<title>New home</title><div><h1>New home</h1></div>")
+
+    def test_deleted_page_and_new_asset(self):
+        os.remove(os.path.join(self.content, "about.md"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.assertEqual(self.poll_and_rebuild(), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "about.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css")))
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+class TestWatchedImageSizes(unittest.TestCase):
+    # --image-sizes under --watch (and the daemon): a replaced image re-sizes the pages that show it
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(self.content)
+        os.makedirs(os.path.join(self.static, "images"))
+        self.image = os.path.join(self.static, "images", "tom.png")
+        self.write(self.image, png(928, 468))
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        with open(os.path.join(self.content, "tom.md"), "w") as f:
+            f.write("# Tom\n\n![Tom](/images/tom.png)")
+        with open(os.path.join(self.content, "index.md"), "w") as f:
+            f.write("# Home")
+        manifest = BuildManifest.load(manifest_path(self.dest))
+        with redirect_stdout(StringIO()):
+            sync_static(self.static, self.dest, manifest)
+            configure_images(ImageAttributes.from_static(self.static, manifest))
+            generate_pages_incremental("/", self.content, self.template, self.dest, manifest=manifest)
+        self.watcher = SiteWatcher("/", self.content, self.static, self.template, self.dest, manifest, image_sizes=True)
+
+    def tearDown(self):
+        configure_images(None)
+        shutil.rmtree(self.root)
+
+    def write(self, path, data):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def rebuild(self, changed, deleted=()):
+        with redirect_stdout(StringIO()):
+            return self.watcher.rebuild(changed, list(deleted))
+
+    def page(self):
+        with open(os.path.join(self.dest, "tom.html")) as f:
+            return f.read()
+
+    def test_replaced_image_resizes_its_pages(self):
+        self.assertIn('width="928" height="468"', self.page())
+        self.write(self.image, png(10, 20))
+        self.assertEqual(self.rebuild([self.image]), 2) # the image and the one page showing it
+        self.assertIn('width="10" height="20"', self.page())
+        with open(os.path.join(self.content, "tom.md"), "a") as f:
+            f.write("\n\nMore.")
+        self.rebuild([os.path.join(self.content, "tom.md")])
+        self.assertIn('width="10" height="20"', self.page()) # later page saves keep the new size
+
+    def test_deleted_image_drops_its_size(self):
+        os.remove(self.image)
+        self.rebuild([], [self.image])
+        self.assertNotIn("width=", self.page())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import re
 from enum import Enum
+from itertools import chain
 
 from textnode import TextNode, TextType
-from htmlnode import HTMLNode, ParentNode, LeafNode
+from htmlnode import HTMLNode, ParentNode, LeafNode, RawHTMLNode
 
 class BlockType(Enum):
     PARAGRAPH = "Paragraph",
@@ -12,9 +13,43 @@ class BlockType(Enum):
     UNORDERED_LIST = "Unordered List"
     ORDERED_LIST = "Ordered List"
 
+HEADING_TAGS = ("", "h1", "h2", "h3", "h4", "h5", "h6") # shared tag strings instead of a new f-string per heading
+
+_url_rewriter = None # a links.UrlRewriter applied to link/image targets as their nodes are created
+
+def configure_url_rewriter(rewriter):
+    global _url_rewriter
+    _url_rewriter = rewriter
+
+_minify = False # cached blocks are stored in the form the page is serialized in
+
+def configure_minify(minify):
+    global _minify
+    _minify = minify
+
+def minify_enabled():
+    return _minify
+
+_stage_timer = None # an instrumentation.StageTimer while --report times a page; the parse charges its stages to it
+
+def configure_stage_timer(timer):
+    global _stage_timer
+    _stage_timer = timer
+
+def stage_timer():
+    return _stage_timer
+
+def stage_lap(stage):
+    if _stage_timer is not None:
+        _stage_timer.lap(stage)
+
 def text_node_to_html_node(textnode):
     if not isinstance(textnode, TextNode):
         raise ValueError("textnode argument should be type TextNode")
+    if _url_rewriter is not None and textnode.url is not None:
+        if textnode.text_type == TextType.IMAGE:
+            return LeafNode("img", "", _url_rewriter.image_props(textnode.url, textnode.text))
+        textnode = TextNode(textnode.text, textnode.text_type, _url_rewriter(textnode.url))
     match textnode.text_type:
         case TextType.TEXT:
             return LeafNode(None, textnode.text)
@@ -36,8 +71,8 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     for node in old_nodes:
         if node.text_type == TextType.TEXT:
             splitnodes = node.text.split(delimiter)
-            for n in splitnodes:
-                if ((splitnodes.index(n) % 2) == 1) and (n != ""):
+            for i, n in enumerate(splitnodes):
+                if ((i % 2) == 1) and (n != ""):
                     new_nodes.append(TextNode(n, text_type))
                 elif (n != ""):
                     new_nodes.append(TextNode(n, TextType.TEXT))
@@ -45,14 +80,21 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
             new_nodes.append(node)
     return new_nodes
 
+IMAGE_PATTERN = re.compile(r"!\[(.+?)\]\((\S+)\)") #very basic md image link parsing
+LINK_PATTERN = re.compile(r"(?<!!)\[(.+?)\]\((\S+)\)") #very basic md hyperlink parsing
+INLINE_SPECIALS = re.compile(r"[_*`!\[]") # characters that can start an inline token
+REGION_ENDS = {
+    TextType.TEXT: re.compile(r"_|\*\*|`"),
+    TextType.BOLD: re.compile(r"_|\*\*"),
+    TextType.ITALIC: re.compile(r"_"),
+}
+
 def extract_markdown_images(text):
-    regmatch = r"!\[(.+?)\]\((\S+)\)" #very basic md image link parsing
-    imagetuples = re.findall(regmatch, text)
+    imagetuples = IMAGE_PATTERN.findall(text)
     return imagetuples
 
 def extract_markdown_links(text):
-    regmatch = r"(?<!!)\[(.+?)\]\((\S+)\)" #very basic md hyperlink parsing
-    linktuples = re.findall(regmatch, text)
+    linktuples = LINK_PATTERN.findall(text)
     return linktuples
 
 def split_nodes_image(old_nodes):
@@ -107,14 +149,73 @@ def split_nodes_link(old_nodes):
     return new_nodes
         
 def text_to_textnodes(text):
-    # Doing all of these with intermediate variables, because it's going to be ugly if nested. 
-    initial = TextNode(text, TextType.TEXT)
-    Italics = split_nodes_delimiter([initial], "_", TextType.ITALIC)
-    Bolds = split_nodes_delimiter(Italics, "**", TextType.BOLD)
-    Codes = split_nodes_delimiter(Bolds, "`", TextType.CODE)
-    Images = split_nodes_image(Codes)
-    finalnodes = split_nodes_link(Images)
-    return finalnodes
+    # Single left-to-right scan. Delimiters keep the precedence the old split_nodes_* passes had:
+    # "_" always toggles italics, "**" only counts outside italics, "`" only outside italics and bold,
+    # and a higher-precedence delimiter resets the lower ones. Images and links are matched in place
+    # (anywhere but code), can't run past the next active delimiter, and keep the surrounding style.
+    nodes = []
+    text_type = TextType.TEXT
+    italic = bold = code = False
+    start = 0
+    i = 0
+    region_end = None
+    next_image = None
+
+    while True:
+        special = INLINE_SPECIALS.search(text, i)
+        if special is None:
+            break
+        i = special.start()
+        char = text[i]
+        if char == "_" or (char == "*" and not italic and text.startswith("**", i)) or (char == "`" and not italic and not bold):
+            if i > start:
+                nodes.append(TextNode(text[start:i], text_type))
+            if char == "_":
+                italic = not italic
+                bold = code = False
+                i += 1
+            elif char == "*":
+                bold = not bold
+                code = False
+                i += 2
+            else:
+                code = not code
+                i += 1
+            start = i
+            region_end = next_image = None
+            if italic:
+                text_type = TextType.ITALIC
+            elif bold:
+                text_type = TextType.BOLD
+            elif code:
+                text_type = TextType.CODE
+            else:
+                text_type = TextType.TEXT
+        elif char in "![" and not code:
+            if region_end is None or region_end < i:
+                found = REGION_ENDS[text_type].search(text, i)
+                region_end = found.start() if found else len(text)
+            if next_image is None or next_image < i:
+                # the old pipeline took images out before looking for links, so a link can't overlap one
+                found = IMAGE_PATTERN.search(text, i, region_end)
+                next_image = found.start() if found else region_end
+            if char == "!":
+                match = IMAGE_PATTERN.match(text, i, region_end)
+            else:
+                match = LINK_PATTERN.match(text, i, next_image)
+            if match is None:
+                i += 1
+                continue
+            if i > start:
+                nodes.append(TextNode(text[start:i], text_type))
+            nodes.append(TextNode(match[1], TextType.IMAGE if char == "!" else TextType.LINK, match[2]))
+            i = start = match.end()
+        else:
+            i += 1
+
+    if len(text) > start:
+        nodes.append(TextNode(text[start:], text_type))
+    return nodes
 
 def markdown_to_blocks(markdown):
     blocks = []
@@ -125,6 +226,83 @@ def markdown_to_blocks(markdown):
             blocks.append(stripped)
     return blocks
 
+ORDERED_ITEM = re.compile(r"(\d+?)\.\s")
+
+def markdown_to_block_lines(markdown):
+    return lines_to_block_lines(markdown.split("\n"))
+
+def lines_to_block_lines(lines):
+    # One forward pass over the lines (any iterable, so a file can be streamed through it). Yields each
+    # block as its list of lines, with the same boundaries ("\n\n") and stripping as markdown_to_blocks,
+    # so classification never has to split the block again.
+    group = []
+    for line in lines:
+        if line != "":
+            group.append(line)
+            continue
+        if group:
+            lines = _strip_block_lines(group)
+            if lines:
+                yield lines
+            group = []
+    if group:
+        lines = _strip_block_lines(group)
+        if lines:
+            yield lines
+
+def _strip_block_lines(lines):
+    # line-wise equivalent of "\n".join(lines).strip()
+    start = 0
+    end = len(lines)
+    while start < end and lines[start].isspace():
+        start += 1
+    while end > start and lines[end - 1].isspace():
+        end -= 1
+    if start == end:
+        return []
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return lines
+
+def classify_block_lines(lines):
+    # block_to_block_type and tag_and_strip_block in one go; returns (block_type, tag, payload) where
+    # payload is the stripped text, or the list of item texts for lists
+    first = lines[0]
+    match first[0]:
+        case "#":
+            if first[0:7].lstrip("#")[:1] == " ":
+                block = "\n".join(lines)
+                stripped = block.lstrip("#")
+                return BlockType.HEADING, HEADING_TAGS[len(block) - len(stripped)], stripped.lstrip()
+        case "`":
+            block = "\n".join(lines)
+            if block[0:3] == "```" and block[-3:] == "```":
+                return BlockType.CODE, "code", block[3:-3]
+            return BlockType.PARAGRAPH, "p", block
+        case ">":
+            if all(line[0] == ">" for line in lines):
+                return BlockType.QUOTE, "blockquote", "\n".join([line[2:] for line in lines])
+        case "-":
+            if all(line[0:2] == "- " for line in lines):
+                return BlockType.UNORDERED_LIST, "ul", [line[2:] for line in lines]
+        case "1":
+            items = []
+            for i, line in enumerate(lines):
+                match = ORDERED_ITEM.match(line)
+                if match is None or int(match[1]) != i + 1:
+                    break
+                items.append(line[match.end():])
+            else:
+                return BlockType.ORDERED_LIST, "ol", items
+    return BlockType.PARAGRAPH, "p", "\n".join(lines)
+
+def scan_blocks(markdown):
+    # (block text, block_type, tag, payload) for every block, from a single scan of the document
+    for lines in markdown_to_block_lines(markdown):
+        block_type, tag, payload = classify_block_lines(lines)
+        yield "\n".join(lines), block_type, tag, payload
+
 def block_to_block_type(block):
     default = False
     match block[0]:
@@ -160,7 +338,7 @@ def block_to_block_type(block):
         case "1":
             try:
                 splits = block.split("\n")
-                if all(list(map(lambda x: int(re.match(r"^(\d+?)\.\s", x)[1]) == (splits.index(x) + 1), splits))): # all lines start with "(line index +1). "
+                if all(int(re.match(r"^(\d+?)\.\s", x)[1]) == (i + 1) for i, x in enumerate(splits)): # all lines start with "(line index +1). "
                     return BlockType.ORDERED_LIST
             except IndexError:
                 pass # don't need to do anything extra for IndexError
@@ -182,8 +360,9 @@ def tag_and_strip_block(block):
             return ("code", block[3:-3])
 
         case BlockType.HEADING:
-            hnum = len(block) - len(block.lstrip("#"))
-            return (f"h{str(hnum)}", block.lstrip("#").lstrip())
+            stripped = block.lstrip("#")
+            hnum = len(block) - len(stripped)
+            return (HEADING_TAGS[hnum], stripped.lstrip())
 
         case BlockType.PARAGRAPH:
             return ("p", block)
@@ -218,21 +397,191 @@ def list_item_to_html_node(block, block_type):
     return nodes
 
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    blocknodes = []
-    for block in blocks:
-        tag, newblock = tag_and_strip_block(block)
-        if tag == "code":
-            blocknodes.append(ParentNode(tag, children=[text_node_to_html_node(TextNode(newblock, TextType.TEXT))]))
-        elif tag == "ol":
-            blocknodes.append(ParentNode(tag, children=list_item_to_html_node(block, BlockType.ORDERED_LIST)))
-        elif tag == "ul":
-            blocknodes.append(ParentNode(tag, children=list_item_to_html_node(block, BlockType.UNORDERED_LIST)))
-        else:
-            blocknodes.append(ParentNode(tag, children=list(map(text_node_to_html_node, text_to_textnodes(newblock)))))
+def block_to_html_node(block, tag, newblock):
+    # builds the node for one block once tag_and_strip_block has classified it
+    if tag == "code":
+        return ParentNode(tag, children=[text_node_to_html_node(TextNode(newblock, TextType.TEXT))])
+    elif tag == "ol":
+        return ParentNode(tag, children=list_item_to_html_node(block, BlockType.ORDERED_LIST))
+    elif tag == "ul":
+        return ParentNode(tag, children=list_item_to_html_node(block, BlockType.UNORDERED_LIST))
+    else:
+        return ParentNode(tag, children=list(map(text_node_to_html_node, text_to_textnodes(newblock))))
+
+def scanned_block_to_html_node(block_type, tag, payload):
+    # same as block_to_html_node, but list items arrive already split by classify_block_lines
+    if block_type == BlockType.CODE:
+        return ParentNode(tag, children=[text_node_to_html_node(TextNode(payload, TextType.TEXT))])
+    if block_type == BlockType.UNORDERED_LIST or block_type == BlockType.ORDERED_LIST:
+        return ParentNode(tag, children=[ParentNode("li", list(map(text_node_to_html_node, text_to_textnodes(item)))) for item in payload])
+    return ParentNode(tag, children=list(map(text_node_to_html_node, text_to_textnodes(payload))))
+
+def block_lines_to_html_node(lines, cache=None):
+    # with a block cache, the block becomes a RawHTMLNode holding its already-rendered HTML
+    timer = _stage_timer
+    if cache is None:
+        if timer is None:
+            return scanned_block_to_html_node(*classify_block_lines(lines))
+        block = classify_block_lines(lines)
+        timer.lap("block_classify")
+        node = scanned_block_to_html_node(*block)
+        timer.lap("inline_parse")
+        return node
+    text = "\n".join(lines)
+    if _url_rewriter is not None and _url_rewriter.cache_salt:
+        text = _url_rewriter.cache_salt + "\0" + text # rewritten links make the HTML basepath-specific
+    if _minify:
+        text = "minify\0" + text
+    key = cache.key(text)
+    entry = cache.get(key)
+    if entry is None:
+        # the block's link targets are cached with its HTML, so the url rewriter still sees them on a hit
+        mark = len(_url_rewriter.seen) if _url_rewriter is not None else 0
+        block = classify_block_lines(lines)
+        if timer is not None:
+            timer.lap("block_classify") # including the key and the missed lookup
+        node = scanned_block_to_html_node(*block)
+        if timer is not None:
+            timer.lap("inline_parse")
+        html = node.to_minified_html() if _minify else node.to_html()
+        if timer is not None:
+            timer.lap("serialize")
+        links = tuple(_url_rewriter.seen[mark:]) if _url_rewriter is not None else ()
+        cache.put(key, (html, links))
+    else:
+        html, links = entry
+        if _url_rewriter is not None:
+            _url_rewriter.seen.extend(links)
+        if timer is not None:
+            timer.lap("inline_parse") # a hit stands in for classifying, parsing and serializing the block
+    return RawHTMLNode(html)
+
+def markdown_to_html_node(markdown, cache=None):
+    blocknodes = [block_lines_to_html_node(lines, cache) for lines in markdown_to_block_lines(markdown)]
     return ParentNode("div", children=blocknodes)
 
+
+class StreamedMarkdown():
+    # Stands in for markdown_to_html_node's div when the source is too big to hold: each block is
+    # parsed, rendered and written as soon as it has been read, then dropped.
+    def __init__(self, open_lines, cache=None):
+        self.open_lines = open_lines # callable returning a fresh iterable of lines
+        self.cache = cache
+
+    def emit_html(self, write):
+        write("<div>")
+        for lines in lines_to_block_lines(self.open_lines()):
+            stage_lap("block_split")
+            block_lines_to_html_node(lines, self.cache).emit_html(write)
+        write("</div>")
+
+    def emit_minified(self, write, preformatted=False):
+        write("<div>")
+        for lines in lines_to_block_lines(self.open_lines()):
+            stage_lap("block_split")
+            block_lines_to_html_node(lines, self.cache).emit_minified(write, preformatted)
+        write("</div>")
+
+
+def _is_title_block(lines):
+    # extract_title's ^#\s test on the joined block
+    return re.match(r"^#\s", lines[0]) is not None or (lines[0] == "#" and len(lines) > 1)
+
+def extract_title_from_block_lines(block_lines):
+    # extract_title over streamed blocks; stops reading at the first h1
+    for lines in block_lines:
+        if _is_title_block(lines):
+            return "\n".join(lines)[2:].strip()
+    raise ValueError("No h1 found")
+
+FRONT_MATTER_FENCE = "---"
+FRONT_MATTER_KEY = re.compile(r"[A-Za-z_][\w-]*")
+
+def split_front_matter(lines):
+    # Optional "key: value" lines between two "---" lines at the very top of a page. Returns
+    # (metadata, the remaining lines); anything that isn't well-formed front matter is left in the body.
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or first.rstrip() != FRONT_MATTER_FENCE:
+        return {}, lines if first is None else chain([first], lines)
+    metadata = {}
+    held = []
+    for line in lines:
+        held.append(line)
+        if line.rstrip() == FRONT_MATTER_FENCE:
+            return metadata, lines
+        if line.strip() == "":
+            continue
+        key, colon, value = line.partition(":")
+        if not colon or not FRONT_MATTER_KEY.fullmatch(key.strip()):
+            break
+        metadata[key.strip()] = value.strip()
+    return {}, chain([first], held, lines)
+
+
+class ParsedDocument():
+    # A page parsed once: front-matter metadata, title (the first h1), heading outline and the body
+    # tree, so nothing has to go back over the markdown to find the title or the headings.
+    def __init__(self, metadata=None, body=None):
+        self.metadata = metadata or {}
+        self.title = None
+        self.headings = [] # [level, text] in document order
+        self.body = body
+
+    def add_block(self, lines, classified=None):
+        # called for every block in order; classified is classify_block_lines(lines) if the caller has it
+        if lines[0][0] != "#":
+            return
+        if self.title is None and _is_title_block(lines):
+            self.title = "\n".join(lines)[2:].strip()
+        block_type, tag, payload = classified or classify_block_lines(lines)
+        if block_type == BlockType.HEADING:
+            self.headings.append([HEADING_TAGS.index(tag), payload])
+
+    def require_title(self):
+        # the h1, else a "title" from the front matter
+        title = self.title if self.title is not None else self.metadata.get("title")
+        if title is None:
+            raise ValueError("No h1 found")
+        return title
+
+    def summary(self):
+        # what the build manifest keeps for the page; see BuildManifest.documents()
+        return {"title": self.title if self.title is not None else self.metadata.get("title"), "headings": self.headings, "metadata": self.metadata}
+
+def parse_document(markdown, cache=None):
+    # markdown_to_html_node and extract_title from the same pass over the blocks
+    metadata, lines = split_front_matter(markdown.split("\n"))
+    document = ParsedDocument(metadata)
+    blocknodes = []
+    for block in lines_to_block_lines(lines):
+        stage_lap("block_split")
+        document.add_block(block)
+        blocknodes.append(block_lines_to_html_node(block, cache))
+    document.body = ParentNode("div", children=blocknodes)
+    return document
+
+_page_document = None # summary of the page rendered last in this process
+
+def record_page_document(document):
+    global _page_document
+    _page_document = document.summary()
+
+def take_page_document():
+    global _page_document
+    summary, _page_document = _page_document, None
+    return summary
+
+def scan_document(lines):
+    # parse_document without building the body, for sources that are streamed (see StreamedMarkdown)
+    metadata, lines = split_front_matter(lines)
+    document = ParsedDocument(metadata)
+    for block in lines_to_block_lines(lines):
+        stage_lap("block_split")
+        document.add_block(block)
+        stage_lap("block_classify")
+    return document
+
 def extract_title(markdown):
     #feels a bit redundant to tag_and_strip_block?
     blocks = markdown_to_blocks(markdown)
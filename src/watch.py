@@ -0,0 +1,160 @@
+import os, time, threading, functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from fileutilities import *
+from imagesize import IMAGE_EXTENSIONS
+
+
+def snapshot_tree(root):
+    # path -> (mtime_ns, size) for every file under root; a missing root is just an empty tree
+    return {site_file.path: (site_file.stat.st_mtime_ns, site_file.stat.st_size) for site_file in SiteInventory.scan(root).files.values()}
+
+def diff_snapshots(old, new):
+    changed = [path for path, stamp in new.items() if old.get(path) != stamp]
+    deleted = [path for path in old if path not in new]
+    return changed, deleted
+
+def serve(directory, port):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {directory} at http://localhost:{port}/")
+    return server
+
+
+class SiteWatcher():
+    def __init__(self, basepath, content_dir, static_dir, template_path, dest_dir, manifest=None, fingerprint=False, image_sizes=False, lazy_images=False):
+        self.basepath = basepath
+        self.fingerprint = fingerprint
+        self.image_sizes = image_sizes # the build's --image-sizes and --lazy-images
+        self.lazy_images = lazy_images
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.manifest = manifest or BuildManifest.load(manifest_path(dest_dir))
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = snapshot_tree(self.content_dir)
+        snapshot.update(snapshot_tree(self.static_dir))
+        try:
+            stat = os.stat(self.template_path)
+            snapshot[self.template_path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def poll(self, quiet=0.1):
+        # returns (changed, deleted) once a burst of saves has settled for `quiet` seconds
+        new = self.scan()
+        changed, deleted = diff_snapshots(self.snapshot, new)
+        if not changed and not deleted:
+            return [], []
+        while True:
+            time.sleep(quiet)
+            settled = self.scan()
+            more_changed, more_deleted = diff_snapshots(new, settled)
+            new = settled
+            if not more_changed and not more_deleted:
+                break
+        changed, deleted = diff_snapshots(self.snapshot, new)
+        self.snapshot = new
+        return changed, deleted
+
+    def rebuild(self, changed, deleted):
+        # rebuilds only what the changed paths affect; returns the number of outputs written or removed
+        content_root = self.content_dir + os.sep
+        static_root = self.static_dir + os.sep
+        static_changes = [path for path in changed + deleted if path.startswith(static_root)]
+        images_changed = self.image_sizes and any(path.lower().endswith(IMAGE_EXTENSIONS) for path in static_changes)
+        if static_changes and (self.fingerprint or images_changed):
+            # hashed names and image sizes change with the content, so re-sync and let the manifest work
+            # out which pages link them
+            copied, _, static_removed = sync_static(self.static_dir, self.dest_dir, self.manifest, fingerprint=self.fingerprint)
+            if self.fingerprint:
+                configure_assets(AssetMap.from_manifest(self.manifest))
+            if self.image_sizes:
+                configure_images(ImageAttributes.from_static(self.static_dir, self.manifest, self.lazy_images))
+            built, _, removed = generate_pages_incremental(self.basepath, self.content_dir, self.template_path, self.dest_dir, manifest=self.manifest)
+            return copied + static_removed + built + removed
+        if self.template_path in changed:
+            built, _, removed = generate_pages_incremental(self.basepath, self.content_dir, self.template_path, self.dest_dir, manifest=self.manifest)
+            return built + removed
+
+        updated = 0
+        indexed = {}
+        unindexed = []
+        for path in changed:
+            if path.startswith(content_root) and path.endswith(".md"):
+                rel_source = os.path.relpath(path, self.content_dir)
+                dest_path = os.path.join(self.dest_dir, rel_source[:-3] + ".html")
+                stat = os.stat(path)
+                source_hash = hash_file(path)
+                if self.manifest.page_is_current(rel_source, source_hash, dest_path):
+                    continue # saved without changes
+                output_hash = generate_page(self.basepath, path, self.template_path, dest_path)
+                precompress(dest_path, output_hash)
+                links = take_page_links()
+                rel_dest = os.path.relpath(dest_path, self.dest_dir)
+                self.manifest.record_page(rel_source, path, source_hash, rel_dest, output_hash, stat, links, take_page_document())
+                terms = take_page_terms()
+                if terms is not None:
+                    indexed[rel_source] = (rel_dest, *terms)
+                updated += 1
+            elif path.startswith(static_root):
+                rel_path = os.path.relpath(path, self.static_dir)
+                dest_path = os.path.join(self.dest_dir, rel_path)
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                print(f"Copying {path} to {dest_path}")
+                copy_file(path, dest_path)
+                record_output(dest_path, True)
+                stat = os.stat(path)
+                self.manifest.static[rel_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": None}
+                precompress(dest_path, f"{stat.st_mtime_ns}:{stat.st_size}")
+                updated += 1
+        for path in deleted:
+            if path.startswith(content_root) and path.endswith(".md"):
+                rel_source = os.path.relpath(path, self.content_dir)
+                entry = self.manifest.pages.pop(rel_source, None)
+                unindexed.append(rel_source)
+                stale = os.path.join(self.dest_dir, entry["dest"]) if entry else None
+            elif path.startswith(static_root):
+                rel_path = os.path.relpath(path, self.static_dir)
+                self.manifest.static.pop(rel_path, None)
+                stale = os.path.join(self.dest_dir, rel_path)
+            else:
+                continue
+            if stale and os.path.exists(stale):
+                remove_output(stale)
+                print(f"Removing {stale}")
+                updated += 1
+            if stale:
+                remove_compressed(stale)
+        if indexed or unindexed:
+            update_search_index(self.dest_dir, self.manifest, indexed, unindexed)
+        flush_block_cache()
+        finish_precompression()
+        self.manifest.save()
+        return updated
+
+    def run(self, interval=0.2, quiet=0.1, stop=None):
+        # stop: a threading.Event that ends the loop after the current rebuild, for callers running it on a thread
+        print(f"Watching {self.content_dir}, {self.static_dir} and {self.template_path} (Ctrl-C to stop)")
+        stop = stop or threading.Event()
+        while not stop.wait(interval):
+            changed, deleted = self.poll(quiet)
+            if not changed and not deleted:
+                continue
+            saved_at = max([self.snapshot[path][0] for path in changed], default=time.time_ns()) / 1e9
+            start = time.perf_counter()
+            try:
+                updated = self.rebuild(changed, deleted)
+            except Exception as e:
+                print(f"\nRebuild failed: {type(e).__name__}: {e}")
+                continue # keep watching, the next save will probably fix it
+            elapsed = time.perf_counter() - start
+            report_broken_links(self.manifest)
+            latency = time.time() - saved_at
+            print(f"\nRebuilt {updated} outputs for {len(changed) + len(deleted)} changed files in {elapsed * 1e3:.0f} ms (save to HTML {latency * 1e3:.0f} ms)")